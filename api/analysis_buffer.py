@@ -0,0 +1,233 @@
+import os
+import json
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWriteBuffer:
+    """Write-behind buffer for analysis_results rows.
+
+    Records are queued in memory and written as bulk inserts by a background
+    thread once `batch_size` rows are pending or `flush_interval` seconds have
+    passed. The queue is bounded by `max_pending`; when it is full new records
+    are either dropped or appended to a JSON-lines spill file that is replayed
+    on a later flush. A failed insert is retried with exponential backoff
+    before its rows overflow. Pending rows are flushed on interpreter exit,
+    and rows added after `close` are written straight away.
+
+    Each row passed to `add` ends up counted exactly once, as flushed, dropped
+    or spilled; rows later inserted from the spill file count as replayed.
+    """
+
+    def __init__(self,
+                 insert_batch: Callable[[List[Dict[str, Any]]], Any],
+                 max_pending: int = None,
+                 batch_size: int = None,
+                 flush_interval: float = None,
+                 overflow: str = None,
+                 spill_path: Optional[str] = None,
+                 max_retries: int = None,
+                 retry_backoff: float = None):
+        """
+        Args:
+            insert_batch: Callable that inserts a list of rows in one request
+            max_pending (int): Maximum number of rows held in memory
+            batch_size (int): Number of pending rows that triggers a flush
+            flush_interval (float): Maximum seconds a row waits before a flush
+            overflow (str): "drop" or "spill" when the queue is full
+            spill_path (Optional[str]): File used for spilled rows
+            max_retries (int): Extra attempts at a failed insert before its rows overflow
+            retry_backoff (float): Seconds before the first retry, doubled on each one after
+        """
+        self.insert_batch = insert_batch
+        self.max_pending = max_pending or int(os.getenv("ANALYSIS_BUFFER_MAX_PENDING", "1000"))
+        self.batch_size = batch_size or int(os.getenv("ANALYSIS_BUFFER_BATCH_SIZE", "50"))
+        self.flush_interval = flush_interval or float(os.getenv("ANALYSIS_BUFFER_FLUSH_INTERVAL", "2.0"))
+        self.overflow = overflow or os.getenv("ANALYSIS_BUFFER_OVERFLOW", "drop")
+        self.spill_path = spill_path or os.getenv("ANALYSIS_BUFFER_SPILL_PATH", "analysis_results.spill.jsonl")
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("ANALYSIS_BUFFER_MAX_RETRIES", "3"))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv("ANALYSIS_BUFFER_RETRY_BACKOFF", "0.5"))
+
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "retries": 0
+        }
+
+        atexit.register(self.close)
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Queue a record without blocking on the database.
+
+        Returns:
+            bool: True if the record was queued, written or spilled, False if dropped
+        """
+        self._ensure_started()
+
+        with self._lock:
+            closed = self._stopped.is_set()
+            overflowed = not closed and len(self._pending) >= self.max_pending
+            if not closed and not overflowed:
+                self._pending.append(record)
+                self.stats["enqueued"] += 1
+                should_wake = len(self._pending) >= self.batch_size
+
+        if closed:
+            # Nothing drains the queue after close, so write the record now
+            return self._write([record]) or self._handle_overflow([record])
+        if overflowed:
+            return self._handle_overflow([record])
+
+        if should_wake:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write all pending rows (and any spilled rows) to the database.
+
+        Returns:
+            int: Number of rows written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    count = min(self.batch_size, len(self._pending))
+                    batch = [self._pending.popleft() for _ in range(count)]
+
+                if self._write(batch):
+                    written += len(batch)
+                else:
+                    self._handle_overflow(batch)
+                    break
+
+            written += self._replay_spill()
+        return written
+
+    def pending_count(self) -> int:
+        """Number of rows waiting in memory."""
+        with self._lock:
+            return len(self._pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return buffer counters together with the current queue depth."""
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
+
+    def close(self):
+        """Stop the background thread and flush whatever is still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing analysis results on shutdown: {str(e)}")
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analysis-write-buffer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing analysis results: {str(e)}")
+
+    def _write(self, batch: List[Dict[str, Any]], counter: str = "flushed") -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.insert_batch(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error bulk inserting {len(batch)} analysis results: {str(e)}")
+                    return False
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning(f"Bulk insert of {len(batch)} analysis results failed, retrying in {delay:.1f}s: {str(e)}")
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(delay)
+                continue
+            with self._lock:
+                self.stats[counter] += len(batch)
+            return True
+        return False
+
+    def _handle_overflow(self, records: List[Dict[str, Any]]) -> bool:
+        if self.overflow == "spill" and self._append_spill(records):
+            with self._lock:
+                self.stats["spilled"] += len(records)
+            return True
+
+        with self._lock:
+            self.stats["dropped"] += len(records)
+        logger.warning(f"Analysis write buffer could not write {len(records)} record(s), dropped them")
+        return False
+
+    def _append_spill(self, records: List[Dict[str, Any]]) -> bool:
+        try:
+            with self._lock:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps(record) + "\n")
+            return True
+        except Exception as e:
+            logger.error(f"Error spilling analysis results to {self.spill_path}: {str(e)}")
+            return False
+
+    def _replay_spill(self) -> int:
+        """Insert rows from the spill file, keeping any that still fail."""
+        if self.overflow != "spill" or not os.path.exists(self.spill_path):
+            return 0
+
+        replay_path = self.spill_path + ".replay"
+        with self._lock:
+            try:
+                os.replace(self.spill_path, replay_path)
+            except FileNotFoundError:
+                return 0
+
+        written = 0
+        try:
+            with open(replay_path, "r", encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                if self._write(batch, counter="replayed"):
+                    written += len(batch)
+                else:
+                    # These rows were counted when first spilled, so putting them back isn't counted again
+                    if not self._append_spill(rows[start:]):
+                        logger.error(f"Lost {len(rows) - start} spilled analysis results")
+                    break
+        finally:
+            os.remove(replay_path)
+        return written
@@ -1,10 +1,11 @@
 import cohere
 import json
 import requests
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 import os
 import logging
+from api.database import Database
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -124,20 +125,13 @@ class NaturalLanguageUnderstanding:
             
         except Exception as e:
             logger.error(f"Error calling chat API for topic: {str(e)}")
-            # Fall back to database for similar queries
+            # Fall back to a previous analysis of the same query
             try:
-                prev_analyses = self._fetch_previous_analyses("natural_language_understanding", 5)
-                if prev_analyses:
-                    # Find the most similar previous query
-                    import difflib
-                    similarities = [(difflib.SequenceMatcher(None, query.lower(), a['query'].lower()).ratio(), a) for a in prev_analyses]
-                    best_match = max(similarities, key=lambda x: x[0])
-                    if best_match[0] > 0.6:  # If similarity is greater than 60%
-                        result_data = json.loads(best_match[1]['result'])
-                        topic = result_data.get('topic', 'general')
-                        logger.info(f"Using topic from similar previous query: {topic}")
-                    else:
-                        topic = "general"
+                prev_analysis = self._fetch_previous_analysis("natural_language_understanding", query)
+                if prev_analysis:
+                    result_data = json.loads(prev_analysis['result'])
+                    topic = result_data.get('topic', 'general')
+                    logger.info(f"Using topic from previous analysis of this query: {topic}")
                 else:
                     topic = "general"
             except Exception as db_err:
@@ -419,18 +413,28 @@ class NaturalLanguageUnderstanding:
             logger.error(f"Error saving analysis to backend: {str(e)}")
             return False
     
-    def _fetch_previous_analyses(self, module: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def _fetch_previous_analysis(self, module: str, query: str) -> Optional[Dict[str, Any]]:
         """
-        Fetch previous analysis results from the database via FastAPI backend.
+        Fetch the previous analysis of a query from the database via FastAPI backend.
+        The lookup is keyed by a hash of the normalized query rather than a scan of recent rows.
         """
         try:
-            # This would require a new endpoint in the FastAPI backend
-            # For now, we'll return an empty list
-            return []
+            query_hash = Database.content_hash(query)
+            response = requests.get(
+                f"{BACKEND_URL}/analyze-query",
+                params={"module": module, "query_hash": query_hash},
+                timeout=5
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 404:
+                logger.error(f"Error fetching previous analysis: {response.status_code}")
+            return None
                 
         except Exception as e:
-            logger.error(f"Error fetching previous analyses: {str(e)}")
-            return []
+            logger.error(f"Error fetching previous analysis: {str(e)}")
+            return None
     
     def _generate_response(self, query: str, analysis: Dict[str, Any], articles: List[Dict[str, Any]]) -> str:
         """
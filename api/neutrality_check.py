@@ -37,6 +37,7 @@ class NeutralityCheck:
             article = self.db.fetch_article_by_id(article_id)
             if article:
                 return {
+                    "article_id": article.get('id'),
                     "customized_article": {
                         "title": article.get('title', ''),
                         "content": article.get('content', article.get('body', ''))
@@ -47,6 +48,7 @@ class NeutralityCheck:
         articles = self.db.fetch_articles(limit=1)
         if articles and len(articles) > 0:
             return {
+                "article_id": articles[0].get('id'),
                 "customized_article": {
                     "title": articles[0].get('title', ''),
                     "content": articles[0].get('content', articles[0].get('body', ''))
@@ -143,7 +145,13 @@ class NeutralityCheck:
             }
             
             # Save the neutrality check result to the database
-            self.db.save_analysis_result(title, result, "neutrality_check")
+            self.db.save_analysis_result(
+                title,
+                result,
+                "neutrality_check",
+                article_id=article_data.get('article_id'),
+                content_hash=self.db.content_hash(title, content)
+            )
             
             return result
             
@@ -5,6 +5,7 @@ from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 import os
 from api.database import Database
+from api.llm_cache import CachedLLMClient
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,7 +19,7 @@ class UnderrepresentedVoices:
         """
         Initialize the Underrepresented Voices module with Cohere API key.
         """
-        self.client = cohere.Client(os.getenv('COHERE_API_KEY'))
+        self.client = CachedLLMClient(cohere.Client(os.getenv('COHERE_API_KEY')), "underrepresented_voices")
         self.db = Database()
 
     def fetch_article_from_db(self, article_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -35,6 +36,7 @@ class UnderrepresentedVoices:
             db_article = self.db.fetch_article_by_id(article_id)
             if db_article:
                 return {
+                    'id': db_article.get('id'),
                     'title': db_article.get('title', ''),
                     'body': db_article.get('content', db_article.get('body', ''))
                 }
@@ -43,6 +45,7 @@ class UnderrepresentedVoices:
         articles = self.db.fetch_articles(limit=1)
         if articles and len(articles) > 0:
             return {
+                'id': articles[0].get('id'),
                 'title': articles[0].get('title', ''),
                 'body': articles[0].get('content', articles[0].get('body', ''))
             }
@@ -137,14 +140,18 @@ class UnderrepresentedVoices:
             logger.error(f"Error calling Cohere API: {str(e)}")
             # Try to get similar analysis from database
             try:
-                prev_analyses = self.db.fetch_previous_analyses("underrepresented_voices", 3)
-                if prev_analyses:
-                    # Use the most recent analysis result since we can't easily compare articles
-                    prev_result_data = json.loads(prev_analyses[0]['result'])
+                prev_analysis = self.db.fetch_analysis(
+                    "underrepresented_voices",
+                    article_id=article.get('id'),
+                    content_hash=self.db.content_hash(article['title'], article['body'])
+                )
+                if prev_analysis:
+                    # Reuse the stored analysis of this same article
+                    prev_result_data = json.loads(prev_analysis['result'])
                     logger.info(f"Using analysis from database as fallback")
                     result = prev_result_data
                 else:
-                    # If no previous analyses, create a minimal structure
+                    # If no previous analysis, create a minimal structure
                     result = {
                         "underrepresented": {
                             "segments": [],
@@ -169,8 +176,14 @@ class UnderrepresentedVoices:
                     ]
                 }
 
-        # Save analysis result to database with the article title as query
-        self.db.save_analysis_result(article['title'], result, "underrepresented_voices")
+        # Save analysis result to database keyed by article ID and content hash
+        self.db.save_analysis_result(
+            article['title'],
+            result,
+            "underrepresented_voices",
+            article_id=article.get('id'),
+            content_hash=self.db.content_hash(article['title'], article['body'])
+        )
         
         return result
 
@@ -44,32 +44,35 @@ class UserCustomization:
             Dict[str, Any]: Enhanced article with DEI section
         """
         # Try to fetch a DEI-focused article from the database
+        article = None
         try:
-            prev_analyses = self.db.fetch_previous_analyses("dei_focus", 5)
-            
-            # If article_id is provided, try to match it with the article ID in the database
-            if article_id and prev_analyses:
-                for analysis in prev_analyses:
-                    # The query field typically contains the article title, not the ID
-                    # We'd need to fetch the article by ID and then match by title
-                    article = self.db.fetch_article_by_id(article_id)
-                    if article and article.get('title', '').lower() == analysis['query'].lower():
-                        dei_result = json.loads(analysis['result'])
-                        logger.info(f"Found matching DEI analysis for article ID: {article_id}")
-                        return dei_result
-            
-            # If no specific article found or no ID provided, use the most recent DEI analysis
-            if prev_analyses:
-                dei_result = json.loads(prev_analyses[0]['result'])
-                logger.info("Using most recent DEI analysis")
-                return dei_result
+            if article_id:
+                # Look up the analysis for this article by its ID or content hash
+                article = self.db.fetch_article_by_id(article_id)
+                content_hash = None
+                if article:
+                    content_hash = self.db.content_hash(
+                        article.get('title', ''),
+                        article.get('content', article.get('body', ''))
+                    )
+                analysis = self.db.fetch_analysis("dei_focus", article_id=article_id, content_hash=content_hash)
+                if analysis:
+                    dei_result = json.loads(analysis['result'])
+                    logger.info(f"Found matching DEI analysis for article ID: {article_id}")
+                    return dei_result
+            else:
+                # If no ID provided, use the most recent DEI analysis
+                prev_analyses = self.db.fetch_previous_analyses("dei_focus", 1)
+                if prev_analyses:
+                    dei_result = json.loads(prev_analyses[0]['result'])
+                    logger.info("Using most recent DEI analysis")
+                    return dei_result
         except Exception as e:
             logger.error(f"Error fetching DEI analysis from database: {str(e)}")
         
         # If no DEI analysis found in the database, fetch a regular article
         try:
-            article = None
-            if article_id:
+            if article_id and not article:
                 article = self.db.fetch_article_by_id(article_id)
             
             if not article:
@@ -188,23 +191,17 @@ class UserCustomization:
             
             # Save the customization result with the user ID as part of the query
             query = f"user:{settings.get('user_id', 'anonymous')}:{article_data['updated_article']['title']}"
-            self.db.save_analysis_result(query, result, "user_customization")
+            self.db.save_analysis_result(query, result, "user_customization", content_hash=self.db.content_hash(query))
         
         except Exception as e:
             logger.error(f"Error calling Cohere API: {str(e)}")
             
             # Try to fetch a previous customization for the same user
             try:
-                # Search for previous customizations by this user
+                # Look up this user's previous customization of the same article
                 user_id = settings.get('user_id', 'anonymous')
-                prev_analyses = self.db.fetch_previous_analyses("user_customization", 10)
-                
-                # Look for a customization with the same user ID
-                user_customization = None
-                for analysis in prev_analyses:
-                    if analysis['query'].startswith(f"user:{user_id}:"):
-                        user_customization = analysis
-                        break
+                query = f"user:{user_id}:{article_data['updated_article']['title']}"
+                user_customization = self.db.fetch_analysis("user_customization", content_hash=self.db.content_hash(query))
                 
                 if user_customization:
                     # If found, use the previous customization
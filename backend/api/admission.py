@@ -0,0 +1,115 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+# Degradation tiers, from full service to cached results only
+TIER_FULL = 0
+TIER_NO_NEUTRAL_ARTICLE = 1
+TIER_NO_SUMMARIES = 2
+TIER_CACHED_ONLY = 3
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted because the server is saturated."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds how many pipelines run at once and how many wait for a slot.
+
+    Requests beyond `max_in_flight` wait in a bounded queue. When the queue is
+    full, or a request waits longer than `queue_timeout`, `AdmissionRejected` is
+    raised so the caller can answer with a fast 503. The queue depth also
+    selects a degradation tier that tells the pipeline how much work to skip.
+
+    Admission runs on the event loop: queued requests wait on an asyncio
+    semaphore and hold no threads, so only admitted pipelines reach the
+    threadpool. `admit` must be used from the server's event loop; the
+    counters are plain integers, so reading stats from a worker thread is safe.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        """
+        Args:
+            max_in_flight (Optional[int]): Maximum number of pipelines running at once
+            max_queue (Optional[int]): Maximum number of requests waiting for a slot
+            queue_timeout (Optional[float]): Seconds a request may wait for a slot
+        """
+        self.max_in_flight = max_in_flight or int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("CHAT_MAX_QUEUE", "32"))
+        self.queue_timeout = queue_timeout or float(os.getenv("CHAT_QUEUE_TIMEOUT", "15"))
+
+        # Created on first use so it belongs to the server's running loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._waiting = 0
+        self.stats = {
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0
+        }
+
+    def current_tier(self) -> int:
+        """Pick a degradation tier from how full the wait queue is."""
+        return self._tier_for(self._waiting)
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold a pipeline slot for the duration of the `async with` block.
+
+        Yields:
+            int: The degradation tier the admitted request should run at
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        tier = self._tier_for(self._waiting)
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise AdmissionRejected("Server is busy, please try again shortly")
+
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                raise AdmissionRejected("Timed out waiting for capacity, please try again shortly")
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self._in_flight += 1
+        self.stats["admitted"] += 1
+        try:
+            yield tier
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters with the current in-flight and queued counts."""
+        return dict(
+            self.stats,
+            in_flight=self._in_flight,
+            waiting=self._waiting,
+            tier=self._tier_for(self._waiting)
+        )
+
+    def _tier_for(self, waiting: int) -> int:
+        if self.max_queue <= 0 or waiting == 0:
+            return TIER_FULL
+        fill = waiting / self.max_queue
+        if fill < 0.25:
+            return TIER_FULL
+        if fill < 0.5:
+            return TIER_NO_NEUTRAL_ARTICLE
+        if fill < 0.75:
+            return TIER_NO_SUMMARIES
+        return TIER_CACHED_ONLY
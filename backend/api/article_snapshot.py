@@ -0,0 +1,359 @@
+import os
+import re
+import sys
+import time
+import base64
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from api.article_text_store import ArticleTextStore
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_TABLE = "articleInformationDB"
+
+# Fields a page of articles can be projected to; "snippet" is the start of the body
+ARTICLE_FIELDS = ("id", "article_titles", "source_name", "source_link", "news_information", "snippet")
+DEFAULT_FIELDS = ("id", "article_titles", "source_name", "source_link", "news_information")
+MAX_ARTICLE_PAGE_SIZE = 100
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class ArticleSnapshot:
+    """Column-oriented in-memory copy of the article table.
+
+    Each column is stored separately: ids in a compact integer array, titles,
+    source names and links in lists (source names are interned, since there
+    are only a few dozen). Article bodies go to a memory-mapped
+    `ArticleTextStore` and are sliced from it on demand, so they don't count
+    against the heap. The snapshot
+    is refreshed incrementally: only rows with an id above the highest id
+    already loaded are fetched, so a refresh costs as much as the new rows.
+    An inverted index from words to rows is extended on every refresh and
+    backs `search`.
+    Every `reconcile_interval` seconds the ids loaded are checked against the
+    table, and rows deleted upstream are dropped from the snapshot and the
+    text store. Rows updated upstream are not picked up until the snapshot
+    is rebuilt; the rebuild rewrites any body whose text changed.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], page_size: int = None,
+                 refresh_interval: float = None, text_store: Optional[ArticleTextStore] = None,
+                 reconcile_interval: float = None):
+        """
+        Args:
+            client_factory: Returns the Supabase client used for refreshes
+            page_size (int): Number of rows fetched per request during a refresh
+            refresh_interval (float): Seconds between background refreshes
+            text_store (Optional[ArticleTextStore]): Where article bodies are kept
+            reconcile_interval (float): Seconds between checks for rows deleted upstream
+        """
+        self.client_factory = client_factory
+        self.text_store = text_store if text_store is not None else ArticleTextStore()
+        self.page_size = page_size or int(os.getenv("ARTICLE_SNAPSHOT_PAGE_SIZE", "500"))
+        self.refresh_interval = refresh_interval or float(os.getenv("ARTICLE_SNAPSHOT_REFRESH_SECONDS", "60"))
+        self.reconcile_interval = reconcile_interval or float(os.getenv("ARTICLE_SNAPSHOT_RECONCILE_SECONDS", "600"))
+
+        self._lock = threading.RLock()
+        self._ids = array('q')
+        self._titles: List[str] = []
+        self._titles_lower: List[str] = []
+        self._source_names: List[str] = []
+        self._source_links: List[str] = []
+        self._row_by_id: Dict[int, int] = {}
+        self._deleted = set()  # Rows whose article was deleted upstream
+        self._postings: Dict[str, array] = {}
+        self.watermark = 0
+        self.loaded = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def start(self):
+        """Load the snapshot and keep refreshing it in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="article-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stopped.set()
+
+    def refresh(self) -> int:
+        """Fetch rows added since the last refresh and append them to the columns.
+
+        Returns:
+            int: Number of rows added
+        """
+        added = 0
+        while True:
+            response = self.client_factory().table(ARTICLE_TABLE) \
+                .select("id, article_titles, source_name, source_link, news_information") \
+                .gt("id", self.watermark) \
+                .order("id") \
+                .limit(self.page_size) \
+                .execute()
+            rows = response.data or []
+            if not rows:
+                break
+            self._append(rows)
+            added += len(rows)
+            if len(rows) < self.page_size:
+                break
+
+        self.loaded.set()
+        if added:
+            logger.info(f"Article snapshot added {added} rows ({len(self)} total)")
+        return added
+
+    def reconcile(self) -> int:
+        """Drop rows whose article has been deleted upstream.
+
+        Only ids are fetched, so this costs a fraction of a rebuild. Rows
+        added after the check started are left alone.
+
+        Returns:
+            int: Number of rows dropped
+        """
+        watermark = self.watermark
+        upstream = set()
+        last_id = 0
+        while True:
+            response = self.client_factory().table(ARTICLE_TABLE) \
+                .select("id") \
+                .gt("id", last_id) \
+                .lte("id", watermark) \
+                .order("id") \
+                .limit(self.page_size) \
+                .execute()
+            rows = response.data or []
+            upstream.update(row['id'] for row in rows)
+            if len(rows) < self.page_size:
+                break
+            last_id = rows[-1]['id']
+
+        with self._lock:
+            deleted = [article_id for article_id in self._row_by_id
+                       if article_id <= watermark and article_id not in upstream]
+            for article_id in deleted:
+                self._deleted.add(self._row_by_id.pop(article_id))
+
+        if deleted:
+            self.text_store.discard(deleted)
+            logger.info(f"Article snapshot dropped {len(deleted)} rows deleted upstream ({len(self)} total)")
+        return len(deleted)
+
+    def search_titles(self, keyword: str) -> List[Dict[str, Any]]:
+        """Return articles whose title contains `keyword`, ignoring case.
+
+        Matches the `ilike '%keyword%'` query previously sent to Supabase.
+        """
+        needle = keyword.lower()
+        with self._lock:
+            return [self._row(row) for row, title in enumerate(self._titles_lower)
+                    if needle in title and row not in self._deleted]
+
+    def search(self, query: Optional[str] = None, limit: int = 20, offset: int = 0,
+               cursor: Optional[str] = None, fields: Optional[Iterable[str]] = None,
+               snippet_chars: int = 200) -> Dict[str, Any]:
+        """Return a page of articles, newest first, optionally matching `query`.
+
+        Every word of `query` must appear in the title or body, found through
+        the inverted index; a multi-word query must also appear as a phrase.
+        Pages continue from `cursor` (the `next_cursor` of the previous page),
+        which stays stable while new articles arrive, or from `offset`.
+
+        Args:
+            query (Optional[str]): Words to match; None lists every article
+            limit (int): Page size, capped at MAX_ARTICLE_PAGE_SIZE
+            offset (int): Rows to skip, applied after `cursor`
+            cursor (Optional[str]): Where the previous page ended
+            fields (Optional[Iterable[str]]): Subset of ARTICLE_FIELDS to return
+            snippet_chars (int): Length of the "snippet" field
+
+        Returns:
+            Dict[str, Any]: The page under "articles" and the "next_cursor", None on the last page
+
+        Raises:
+            ValueError: If `cursor` or `fields` is invalid
+        """
+        limit = max(1, min(limit, MAX_ARTICLE_PAGE_SIZE))
+        fields = tuple(fields or DEFAULT_FIELDS)
+        unknown = [field for field in fields if field not in ARTICLE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        before_id = self.decode_cursor(cursor) if cursor else None
+
+        with self._lock:
+            if query:
+                rows = self._matching_rows(query)
+                if before_id is not None:
+                    rows = (row for row in rows if self._ids[row] < before_id)
+            else:
+                end = bisect_left(self._ids, before_id) if before_id is not None else len(self._ids)
+                rows = (row for row in range(end - 1, -1, -1) if row not in self._deleted)
+
+            # Take one extra row to find out whether there is another page
+            page = list(islice(rows, max(0, offset), max(0, offset) + limit + 1))
+            next_cursor = None
+            if len(page) > limit:
+                page = page[:limit]
+                next_cursor = self.encode_cursor(self._ids[page[-1]])
+            articles = [self._project(row, fields, snippet_chars) for row in page]
+
+        return {"articles": articles, "next_cursor": next_cursor}
+
+    def match_keywords(self, keywords: Iterable[str], limit: int = 20, snippet_chars: int = 200) -> List[Dict[str, Any]]:
+        """Return articles matching any of `keywords`, best matches first.
+
+        Each keyword is looked up in the inverted index with the same rules as
+        `search`, so all keywords are matched in one pass over their posting
+        lists rather than by scanning article bodies. Articles matching more
+        keywords rank first, then newer articles.
+
+        Returns:
+            List[Dict[str, Any]]: id, article_titles, source_name, snippet and the matched_keywords
+        """
+        limit = max(1, min(limit, MAX_ARTICLE_PAGE_SIZE))
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+
+        with self._lock:
+            matched: Dict[int, List[str]] = {}
+            for keyword in keywords:
+                for row in self._matching_rows(keyword):
+                    matched.setdefault(row, []).append(keyword)
+
+            rows = sorted(matched, key=lambda row: (len(matched[row]), row), reverse=True)[:limit]
+            fields = ("id", "article_titles", "source_name", "snippet")
+            return [
+                dict(self._project(row, fields, snippet_chars), matched_keywords=matched[row])
+                for row in rows
+            ]
+
+    @staticmethod
+    def encode_cursor(article_id: int) -> str:
+        return base64.urlsafe_b64encode(str(article_id).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> int:
+        try:
+            return int(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    def get(self, article_id: int) -> Optional[Dict[str, Any]]:
+        """Return the article with `article_id`, or None if it isn't in the snapshot."""
+        with self._lock:
+            row = self._row_by_id.get(int(article_id))
+            return self._row(row) if row is not None else None
+
+    def text(self, article_id: int, max_chars: Optional[int] = None) -> Optional[str]:
+        """Return the body of an article, or only its first `max_chars` characters."""
+        if int(article_id) not in self._row_by_id:
+            return None
+        return self.text_store.text(article_id, max_chars)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Approximate heap bytes held by each column, plus the on-disk text store."""
+        with self._lock:
+            return {
+                "rows": len(self._ids),
+                "ids": self._ids.itemsize * len(self._ids),
+                "titles": sum(sys.getsizeof(t) for t in self._titles) * 2,
+                "links": sum(sys.getsizeof(l) for l in self._source_links),
+                "index_terms": len(self._postings),
+                "index_postings": sum(p.itemsize * len(p) for p in self._postings.values()),
+                "text_store": self.text_store.get_stats()
+            }
+
+    def _append(self, rows: List[Dict[str, Any]]):
+        # Bodies already stored unchanged by an earlier run or another worker are skipped
+        self.text_store.append((row['id'], row.get('news_information')) for row in rows)
+
+        with self._lock:
+            for row in rows:
+                title = row.get('article_titles') or ''
+                position = len(self._ids)
+                terms = set(TOKEN_PATTERN.findall(title.lower()))
+                terms.update(TOKEN_PATTERN.findall((row.get('news_information') or '').lower()))
+                for term in terms:
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = array('I')
+                    postings.append(position)
+
+                self._row_by_id[row['id']] = position
+                self._ids.append(row['id'])
+                self._titles.append(title)
+                self._titles_lower.append(title.lower())
+                self._source_names.append(sys.intern(row.get('source_name') or ''))
+                self._source_links.append(row.get('source_link') or '')
+            self.watermark = max(self.watermark, rows[-1]['id'])
+
+    def _matching_rows(self, query: str) -> Iterator[int]:
+        terms = TOKEN_PATTERN.findall(query.lower())
+        if not terms:
+            return iter(())
+        postings = [self._postings.get(term) for term in terms]
+        if any(p is None for p in postings):
+            return iter(())
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+        candidates.difference_update(self._deleted)
+        rows = sorted(candidates, reverse=True)
+        if len(terms) == 1:
+            return iter(rows)
+
+        # Rows have every word; keep those where the words also appear in order
+        phrase = " ".join(terms)
+        return (row for row in rows if self._contains_phrase(row, phrase))
+
+    def _contains_phrase(self, row: int, phrase: str) -> bool:
+        for text in (self._titles_lower[row], self.text_store.text(self._ids[row]) or ''):
+            if phrase in " ".join(TOKEN_PATTERN.findall(text.lower())):
+                return True
+        return False
+
+    def _project(self, row: int, fields: Iterable[str], snippet_chars: int) -> Dict[str, Any]:
+        article_id = self._ids[row]
+        values = {
+            "id": lambda: article_id,
+            "article_titles": lambda: self._titles[row],
+            "source_name": lambda: self._source_names[row],
+            "source_link": lambda: self._source_links[row],
+            "news_information": lambda: self.text_store.text(article_id) or '',
+            "snippet": lambda: self.text_store.text(article_id, snippet_chars) or ''
+        }
+        # Bodies are only read from the text store when asked for
+        return {field: values[field]() for field in fields}
+
+    def _row(self, row: int) -> Dict[str, Any]:
+        return {
+            "id": self._ids[row],
+            "article_titles": self._titles[row],
+            "source_name": self._source_names[row],
+            "source_link": self._source_links[row],
+            "news_information": self.text_store.text(self._ids[row]) or ''
+        }
+
+    def _run(self):
+        last_reconcile = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+                if time.monotonic() - last_reconcile >= self.reconcile_interval:
+                    last_reconcile = time.monotonic()
+                    self.reconcile()
+            except Exception as e:
+                logger.error(f"Error refreshing article snapshot: {str(e)}")
+            self._stopped.wait(self.refresh_interval)
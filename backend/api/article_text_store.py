@@ -0,0 +1,303 @@
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+# One index record per stored body: id, byte offset into the blob, byte length
+# and a digest of the body. A negative length marks the id as discarded.
+INDEX_RECORD = struct.Struct("<qqqQ")
+DISCARDED = -1
+
+
+class ArticleTextStore:
+    """Append-only article body store: one UTF-8 blob file plus an offsets index.
+
+    The blob is memory-mapped for reads, so a body is decoded straight from the
+    page cache when asked for and nothing but the index (32 bytes per article)
+    lives on the Python heap. The OS pages the blob in and out as needed, so
+    resident memory stays flat however large the corpus gets. Every uvicorn
+    worker on the node can share the same files.
+
+    Bodies are keyed by article id and a digest of their text: appending an
+    id whose text has changed writes the new body and the index points at it
+    from then on. The superseded bytes stay in the blob until `compact`
+    rewrites the live bodies into a new generation of files, which happens
+    on open once they make up `compact_ratio` of the blob.
+    """
+
+    def __init__(self, path: Optional[str] = None, compact_ratio: Optional[float] = None):
+        """
+        Args:
+            path (Optional[str]): Directory holding the blob and index files
+            compact_ratio (Optional[float]): Share of superseded bytes in the blob that triggers a compaction on open
+        """
+        self.path = path or os.getenv("ARTICLE_STORE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "biasbreaker", "articles"))
+        self.compact_ratio = compact_ratio if compact_ratio is not None else float(os.getenv("ARTICLE_STORE_COMPACT_RATIO", "0.5"))
+        os.makedirs(self.path, exist_ok=True)
+        self.current_path = os.path.join(self.path, "articles.current")
+        self.lock_path = os.path.join(self.path, "articles.lock")
+        open(self.lock_path, "ab").close()
+
+        self._lock = threading.RLock()
+        self._generation = None
+        self._mmap = None
+        with self._lock:
+            self._load_index()
+            blob_bytes = os.path.getsize(self.blob_path)
+            if self._stale_bytes and self._stale_bytes >= self.compact_ratio * blob_bytes:
+                self.compact()
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def __contains__(self, article_id: int) -> bool:
+        return int(article_id) in self._row_by_id
+
+    def append(self, articles: Iterable[Tuple[int, str]]) -> int:
+        """Write the bodies of articles that aren't stored yet or whose text has changed.
+
+        Args:
+            articles: (article_id, text) pairs
+
+        Returns:
+            int: Number of bodies written
+        """
+        with self._lock, self._file_lock():
+            # Pick up anything another worker appended since we last looked
+            self._load_index()
+            offset = os.path.getsize(self.blob_path)
+            chunks = []
+            records = []
+            batch_ids = set()
+            for article_id, text in articles:
+                article_id = int(article_id)
+                if article_id in batch_ids:
+                    continue
+                data = (text or "").encode("utf-8")
+                digest = self._digest(data)
+                row = self._row_by_id.get(article_id)
+                if row is not None and self._digests[row] == digest:
+                    continue
+                chunks.append(data)
+                records.append((article_id, offset, len(data), digest))
+                batch_ids.add(article_id)
+                offset += len(data)
+
+            if not records:
+                return 0
+
+            # The blob is written first, so a crash in between leaves only unindexed bytes
+            with open(self.blob_path, "ab") as blob:
+                blob.write(b"".join(chunks))
+            self._write_index(records)
+            return len(records)
+
+    def discard(self, article_ids: Iterable[int]) -> int:
+        """Forget the bodies of articles that were deleted upstream.
+
+        Returns:
+            int: Number of bodies discarded
+        """
+        with self._lock, self._file_lock():
+            self._load_index()
+            records = [(article_id, 0, DISCARDED, 0) for article_id in {int(i) for i in article_ids}
+                       if article_id in self._row_by_id]
+            if records:
+                self._write_index(records)
+            return len(records)
+
+    def text(self, article_id: int, max_chars: Optional[int] = None) -> Optional[str]:
+        """Return the body of an article, or None if it isn't stored.
+
+        Args:
+            article_id (int): The article to read
+            max_chars (Optional[int]): Decode only this many leading characters
+
+        Returns:
+            Optional[str]: The body, or its first `max_chars` characters
+        """
+        with self._lock:
+            # A second try covers a compaction by another worker swapping the files underneath
+            for _ in range(2):
+                location = self._locate(article_id)
+                if location is None:
+                    return None
+                offset, length = location
+                if max_chars is not None:
+                    # A UTF-8 character is at most 4 bytes, so this covers max_chars
+                    length = min(length, max_chars * 4)
+                data = self._view(offset, length)
+                if data is not None:
+                    break
+            else:
+                return None
+        if max_chars is None:
+            return data.decode("utf-8")
+        return data.decode("utf-8", errors="ignore")[:max_chars]
+
+    def compact(self) -> int:
+        """Rewrite the live bodies into a new generation of files and drop the old one.
+
+        Returns:
+            int: Number of superseded bytes reclaimed
+        """
+        with self._lock, self._file_lock():
+            self._load_index()
+            if not self._stale_bytes:
+                return 0
+            reclaimed = self._stale_bytes
+            old_files = (self.blob_path, self.index_path)
+            generation = self._generation + 1
+            blob_path, index_path = self._files(generation)
+
+            records = []
+            with open(self.blob_path, "rb") as source, open(blob_path, "wb") as blob:
+                offset = 0
+                for article_id, row in sorted(self._row_by_id.items()):
+                    source.seek(self._offsets[row])
+                    data = source.read(self._lengths[row])
+                    blob.write(data)
+                    records.append(INDEX_RECORD.pack(article_id, offset, len(data), self._digests[row]))
+                    offset += len(data)
+            with open(index_path, "wb") as index:
+                index.write(b"".join(records))
+
+            # Readers follow articles.current, so the switch to the new files is a single rename
+            current_tmp = self.current_path + ".tmp"
+            with open(current_tmp, "w") as current:
+                current.write(str(generation))
+            os.replace(current_tmp, self.current_path)
+            self._load_index()
+
+            # Workers still mapping the old blob keep reading it until they next look up the generation
+            for old_file in old_files:
+                try:
+                    os.remove(old_file)
+                except FileNotFoundError:
+                    pass
+            return reclaimed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of stored bodies and the on-disk sizes."""
+        with self._lock:
+            self._load_index()
+            return {
+                "articles": len(self._row_by_id),
+                "blob_bytes": os.path.getsize(self.blob_path),
+                "index_bytes": self._index_position,
+                "stale_bytes": self._stale_bytes,
+                "generation": self._generation
+            }
+
+    def close(self):
+        """Unmap the blob file."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def _locate(self, article_id: int) -> Optional[Tuple[int, int]]:
+        row = self._row_by_id.get(int(article_id))
+        if row is None:
+            # Another worker may have stored it since the index was read
+            self._load_index()
+            row = self._row_by_id.get(int(article_id))
+        if row is None:
+            return None
+        return self._offsets[row], self._lengths[row]
+
+    def _view(self, offset: int, length: int) -> Optional[bytes]:
+        if length == 0:
+            return b""
+        if self._mmap is None or offset + length > len(self._mmap):
+            # The blob has grown past the current mapping, or been replaced by a compaction
+            if self._read_generation() != self._generation:
+                self._load_index()
+                return None
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            with open(self.blob_path, "rb") as blob:
+                if os.fstat(blob.fileno()).st_size < offset + length:
+                    return None
+                self._mmap = mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[offset:offset + length]
+
+    def _write_index(self, records):
+        with open(self.index_path, "ab") as index:
+            index.write(b"".join(INDEX_RECORD.pack(*record) for record in records))
+        self._load_index()
+
+    def _load_index(self):
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._open_generation(generation)
+
+        # Reads only the records added since the last call; a partially written
+        # trailing record is left for the next call
+        with open(self.index_path, "rb") as index:
+            index.seek(self._index_position)
+            data = index.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        for article_id, offset, length, digest in INDEX_RECORD.iter_unpack(data[:usable]):
+            previous = self._row_by_id.pop(article_id, None)
+            if previous is not None:
+                self._stale_bytes += self._lengths[previous]
+            if length == DISCARDED:
+                continue
+            self._row_by_id[article_id] = len(self._offsets)
+            self._offsets.append(offset)
+            self._lengths.append(length)
+            self._digests.append(digest)
+        self._index_position += usable
+
+    def _open_generation(self, generation: int):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._generation = generation
+        self.blob_path, self.index_path = self._files(generation)
+        for file_path in (self.blob_path, self.index_path):
+            open(file_path, "ab").close()
+        self._offsets = array('q')
+        self._lengths = array('q')
+        self._digests = array('Q')
+        self._row_by_id: Dict[int, int] = {}
+        self._index_position = 0
+        self._stale_bytes = 0
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self.current_path) as current:
+                return int(current.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _files(self, generation: int) -> Tuple[str, str]:
+        return (os.path.join(self.path, f"articles.{generation}.blob"),
+                os.path.join(self.path, f"articles.{generation}.idx"))
+
+    @staticmethod
+    def _digest(data: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "ab") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -1,15 +1,27 @@
 import os
-import bcrypt
+import re
+import time
+import asyncio
+import base64
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from datetime import datetime
 from pydantic import BaseModel, EmailStr, Field, validator
-from supabase import Client
+from api.password_hasher import PasswordHasher, PasswordHasherBusy
+
+if TYPE_CHECKING:
+    from supabase import Client
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Largest page of search history returned by get_user_queries
+MAX_QUERY_PAGE_SIZE = 100
+
+# ISO 8601 timestamp as stored in search_history; cursor timestamps must match it
+# before they are put into a filter string
+CURSOR_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}(:?\d{2})?)?')
+
 class UserCreate(BaseModel):
     email: EmailStr
     name: str
@@ -28,21 +40,41 @@ class UserLogin(BaseModel):
 class Auth:
     """Authentication manager for user operations"""
     
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: "Client", user_cache_ttl: Optional[float] = None,
+                 password_hasher: Optional[PasswordHasher] = None,
+                 revocation_ttl: Optional[float] = None):
         """Initialize with a Supabase client"""
         self.supabase = supabase_client
+        self.password_hasher = password_hasher or PasswordHasher()
         
-    def register_user(self, user_data: UserCreate) -> Dict[str, Any]:
+        # Short-lived cache of user records keyed by user ID, so authenticated
+        # requests don't query the users table every time
+        if user_cache_ttl is None:
+            user_cache_ttl = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+        self.user_cache_ttl = user_cache_ttl
+        self._user_cache: Dict[int, Any] = {}
+        # Whether each user still exists, re-checked against the users table
+        # every `revocation_ttl` seconds, so a deletion made by any worker
+        # revokes tokens carrying embedded claims within that window
+        if revocation_ttl is None:
+            revocation_ttl = float(os.getenv("USER_REVOCATION_TTL_SECONDS", "30"))
+        self.revocation_ttl = revocation_ttl
+        self._user_exists: Dict[int, Any] = {}
+        self._user_cache_lock = threading.Lock()
+        self._query_save_stats = {"saved": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        
+    async def register_user(self, user_data: UserCreate) -> Dict[str, Any]:
         """Register a new user"""
         try:
             # Check if user already exists
-            existing_user = self.supabase.table("users").select("*").eq("email", user_data.email).execute()
+            existing_user = await self._execute(self.supabase.table("users").select("*").eq("email", user_data.email))
             
             if existing_user.data and len(existing_user.data) > 0:
                 return {"success": False, "message": "Email already registered"}
             
             # Hash the password
-            hashed_password = bcrypt.hashpw(user_data.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            hashed_password = await asyncio.wrap_future(self.password_hasher.submit_hash(user_data.password))
             
             # Create user record
             new_user = {
@@ -53,7 +85,7 @@ class Auth:
             }
             
             # Insert into database
-            response = self.supabase.table("users").insert(new_user).execute()
+            response = await self._execute(self.supabase.table("users").insert(new_user))
             
             if response.data:
                 user_data = response.data[0]
@@ -63,15 +95,17 @@ class Auth:
             else:
                 return {"success": False, "message": "Failed to create user"}
                 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             logger.error(f"Error during user registration: {str(e)}")
             return {"success": False, "message": f"Registration error: {str(e)}"}
     
-    def login_user(self, credentials: UserLogin) -> Dict[str, Any]:
+    async def login_user(self, credentials: UserLogin) -> Dict[str, Any]:
         """Authenticate a user"""
         try:
             # Get user by email
-            response = self.supabase.table("users").select("*").eq("email", credentials.email).execute()
+            response = await self._execute(self.supabase.table("users").select("*").eq("email", credentials.email))
             
             if not response.data or len(response.data) == 0:
                 return {"success": False, "message": "Invalid email or password"}
@@ -79,10 +113,10 @@ class Auth:
             user = response.data[0]
             
             # Check password
-            is_valid = bcrypt.checkpw(
-                credentials.password.encode('utf-8'),
-                user["hashed_password"].encode('utf-8')
-            )
+            is_valid = await asyncio.wrap_future(self.password_hasher.submit_check(
+                credentials.password,
+                user["hashed_password"]
+            ))
             
             if not is_valid:
                 return {"success": False, "message": "Invalid email or password"}
@@ -93,33 +127,91 @@ class Auth:
             
             return {"success": True, "user": user_data}
             
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             logger.error(f"Error during login: {str(e)}")
             return {"success": False, "message": f"Login error: {str(e)}"}
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get user information by ID"""
+        """Get user information by ID, served from the user cache when fresh"""
+        cached = self._get_cached_user(user_id)
+        if cached is not None:
+            return cached
+        
         try:
             response = self.supabase.table("users").select("*").eq("id", user_id).execute()
             
             if not response.data or len(response.data) == 0:
+                self._remember_user_exists(user_id, False)
                 return None
                 
             user = response.data[0]
             # Remove password from response
             user.pop("hashed_password", None)
             
+            self._cache_user(user_id, user)
+            self._remember_user_exists(user_id, True)
             return user
             
         except Exception as e:
             logger.error(f"Error fetching user: {str(e)}")
             return None
     
-    def update_password(self, user_id: int, current_password: str, new_password: str) -> Dict[str, Any]:
+    def invalidate_user(self, user_id: int):
+        """Drop a user from the user cache"""
+        with self._user_cache_lock:
+            self._user_cache.pop(int(user_id), None)
+    
+    def is_user_deleted(self, user_id: int) -> bool:
+        """Check whether the user's account has been deleted by any worker
+        
+        The users table is the shared record: the answer is cached for
+        `revocation_ttl` seconds and then looked up again with an ID-only query.
+        """
+        user_id = int(user_id)
+        with self._user_cache_lock:
+            entry = self._user_exists.get(user_id)
+        if entry is not None and entry[0] >= time.monotonic():
+            return not entry[1]
+        
+        try:
+            response = self.supabase.table("users").select("id").eq("id", user_id).limit(1).execute()
+            exists = bool(response.data)
+        except Exception as e:
+            # Fail closed: the token is only accepted once the account is confirmed to exist
+            logger.error(f"Error checking user {user_id}: {str(e)}")
+            return True
+        
+        self._remember_user_exists(user_id, exists)
+        return not exists
+    
+    def _remember_user_exists(self, user_id: int, exists: bool):
+        with self._user_cache_lock:
+            self._user_exists[int(user_id)] = (time.monotonic() + self.revocation_ttl, exists)
+    
+    def _get_cached_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._user_cache_lock:
+            entry = self._user_cache.get(int(user_id))
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._user_cache[int(user_id)]
+                return None
+            return dict(user)
+    
+    def _cache_user(self, user_id: int, user: Dict[str, Any]):
+        if self.user_cache_ttl <= 0:
+            return
+        with self._user_cache_lock:
+            self._user_cache[int(user_id)] = (time.monotonic() + self.user_cache_ttl, dict(user))
+    
+    async def update_password(self, user_id: int, current_password: str, new_password: str) -> Dict[str, Any]:
         """Update user password"""
         try:
             # Get current user
-            response = self.supabase.table("users").select("*").eq("id", user_id).execute()
+            response = await self._execute(self.supabase.table("users").select("*").eq("id", user_id))
             
             if not response.data or len(response.data) == 0:
                 return {"success": False, "message": "User not found"}
@@ -127,31 +219,39 @@ class Auth:
             user = response.data[0]
             
             # Verify current password
-            is_valid = bcrypt.checkpw(
-                current_password.encode('utf-8'),
-                user["hashed_password"].encode('utf-8')
-            )
+            is_valid = await asyncio.wrap_future(self.password_hasher.submit_check(
+                current_password,
+                user["hashed_password"]
+            ))
             
             if not is_valid:
                 return {"success": False, "message": "Current password is incorrect"}
             
             # Hash the new password
-            hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            hashed_password = await asyncio.wrap_future(self.password_hasher.submit_hash(new_password))
             
             # Update in database
-            update_response = self.supabase.table("users").update(
+            update_response = await self._execute(self.supabase.table("users").update(
                 {"hashed_password": hashed_password}
-            ).eq("id", user_id).execute()
+            ).eq("id", user_id))
             
             if update_response.data:
+                self.invalidate_user(user_id)
                 return {"success": True, "message": "Password updated successfully"}
             else:
                 return {"success": False, "message": "Failed to update password"}
                 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             logger.error(f"Error updating password: {str(e)}")
             return {"success": False, "message": f"Update error: {str(e)}"}
     
+    @staticmethod
+    async def _execute(request):
+        """Run a Supabase request on a worker thread; the thread is only held for the query itself"""
+        return await asyncio.to_thread(request.execute)
+    
     def delete_user(self, user_id: int) -> Dict[str, Any]:
         """Delete a user account"""
         try:
@@ -159,6 +259,8 @@ class Auth:
             response = self.supabase.table("users").delete().eq("id", user_id).execute()
             
             if response.data:
+                self.invalidate_user(user_id)
+                self._remember_user_exists(user_id, False)
                 # Also delete all user queries
                 self.supabase.table("search_history").delete().eq("user_id", user_id).execute()
                 return {"success": True, "message": "Account deleted successfully"}
@@ -170,58 +272,105 @@ class Auth:
             return {"success": False, "message": f"Deletion error: {str(e)}"}
             
     def save_user_query(self, user_id: int, query: str) -> Dict[str, Any]:
-        """Save a user's search query to history"""
+        """Save a user's search query to history
+        
+        Uses a single upsert against the (user_id, query) unique constraint, so a
+        repeated query is a no-op instead of a lookup followed by an insert.
+        """
+        # Don't save empty queries
+        if not query or query.strip() == "":
+            return {"success": False, "message": "Empty query not saved"}
+        
         try:
-            # Don't save empty queries
-            if not query or query.strip() == "":
-                logger.warning(f"Empty query not saved for user {user_id}")
-                return {"success": False, "message": "Empty query not saved"}
-            
-            logger.info(f"Attempting to save query for user {user_id}: '{query}'")
-            
-            # Check for duplicates to avoid saving the same query multiple times
-            existing_query = self.supabase.table("search_history").select("*").eq("user_id", user_id).eq("query", query).execute()
-            
-            if existing_query.data and len(existing_query.data) > 0:
-                # Query already exists, no need to save again
-                logger.info(f"Query already exists for user {user_id}, not saving duplicate")
-                return {"success": True, "query_id": existing_query.data[0]["id"], "message": "Query already exists"}
-            
-            # Prepare the new query record
             new_query = {
                 "user_id": user_id,
                 "query": query,
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            # Insert into database
-            logger.info(f"Inserting new query into search_history table: {new_query}")
-            response = self.supabase.table("search_history").insert(new_query).execute()
+            response = self.supabase.table("search_history").upsert(
+                new_query,
+                on_conflict="user_id,query",
+                ignore_duplicates=True
+            ).execute()
             
+            self._count_query_save("saved")
             if response.data:
-                logger.info(f"Successfully saved query, ID: {response.data[0]['id']}")
                 return {"success": True, "query_id": response.data[0]["id"]}
-            else:
-                logger.error(f"Failed to save query, no data returned from insert operation")
-                return {"success": False, "message": "Failed to save query, no data returned"}
+            return {"success": True, "message": "Query already exists"}
                 
         except Exception as e:
-            logger.error(f"Error saving query for user {user_id}: {str(e)}")
-            # Log more details about the exception for debugging
-            import traceback
-            logger.error(traceback.format_exc())
+            self._count_query_save("failed")
+            logger.warning(f"Error saving query for user {user_id}: {str(e)}")
             return {"success": False, "message": f"Query save error: {str(e)}"}
     
-    def get_user_queries(self, user_id: int, limit: int = 20) -> Dict[str, Any]:
-        """Get a user's search history"""
+    def get_query_save_stats(self) -> Dict[str, int]:
+        """Return counters for search history writes"""
+        with self._stats_lock:
+            return dict(self._query_save_stats)
+    
+    def _count_query_save(self, outcome: str):
+        with self._stats_lock:
+            self._query_save_stats[outcome] += 1
+    
+    def get_user_queries(self, user_id: int, limit: int = 20, cursor: Optional[str] = None,
+                         include_total: bool = False) -> Dict[str, Any]:
+        """Get a page of a user's search history, newest first
+        
+        Pages are keyset-paginated on (timestamp, id): `cursor` is the
+        `next_cursor` of the previous page, so every page is a single index
+        range scan no matter how deep into the history it is. The total is
+        the planner's row estimate, which avoids counting every row.
+        """
+        limit = max(1, min(limit, MAX_QUERY_PAGE_SIZE))
         try:
-            response = self.supabase.table("search_history").select("*").eq("user_id", user_id).order("timestamp", desc=True).limit(limit).execute()
-            
-            if response.data:
-                return {"success": True, "queries": response.data}
+            if include_total:
+                request = self.supabase.table("search_history").select("*", count="estimated")
             else:
-                return {"success": True, "queries": []}
+                request = self.supabase.table("search_history").select("*")
+            request = request.eq("user_id", user_id)
+            
+            if cursor:
+                timestamp, query_id = self._decode_query_cursor(cursor)
+                request = request.or_(
+                    f'timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{query_id})'
+                )
+            
+            # Fetch one extra row to find out whether there is another page
+            response = request.order("timestamp", desc=True) \
+                .order("id", desc=True) \
+                .limit(limit + 1) \
+                .execute()
+            
+            queries = response.data or []
+            next_cursor = None
+            if len(queries) > limit:
+                queries = queries[:limit]
+                next_cursor = self._encode_query_cursor(queries[-1])
+            
+            result = {"success": True, "queries": queries, "next_cursor": next_cursor}
+            if include_total:
+                result["total"] = response.count
+            return result
                 
+        except ValueError:
+            return {"success": False, "message": "Invalid cursor"}
         except Exception as e:
             logger.error(f"Error fetching queries: {str(e)}")
-            return {"success": False, "message": f"Query fetch error: {str(e)}"} 
\ No newline at end of file
+            return {"success": False, "message": f"Query fetch error: {str(e)}"}
+    
+    @staticmethod
+    def _encode_query_cursor(row: Dict[str, Any]) -> str:
+        raw = f"{row['timestamp']}|{row['id']}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+    
+    @staticmethod
+    def _decode_query_cursor(cursor: str):
+        try:
+            timestamp, query_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit("|", 1)
+            query_id = int(query_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if not CURSOR_TIMESTAMP.fullmatch(timestamp):
+            raise ValueError("Invalid cursor")
+        return timestamp, query_id
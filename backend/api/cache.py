@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        """
+        Args:
+            max_entries (int): Maximum number of entries before the least recently used is evicted
+            ttl (float): Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store `value` under `key`, evicting the least recently used entries if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def delete(self, key: Hashable):
+        """Remove `key` from the cache if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return hit, miss and eviction counters with the current size."""
+        with self._lock:
+            return dict(self.stats, size=len(self._entries))
+
+
+class SQLiteCache:
+    """Cache shared by every worker process on a node, stored in one SQLite file.
+
+    The database runs in WAL mode so readers in different uvicorn workers don't
+    block each other or the writer. Entries expire after a TTL and each
+    namespace is bounded to `max_entries`, and optionally to `max_bytes` of
+    stored JSON, evicting the least recently used. Values must be
+    JSON-serializable.
+    """
+
+    # How many sets happen between eviction sweeps
+    EVICT_EVERY = 32
+
+    def __init__(self, namespace: str, max_entries: int = 256, ttl: float = 300.0,
+                 path: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            namespace (str): Separates this cache's keys from other caches in the same file
+            max_entries (int): Maximum number of entries kept for this namespace
+            ttl (float): Seconds an entry stays valid
+            path (Optional[str]): SQLite file shared by the workers
+            max_bytes (Optional[int]): Ceiling on the serialized size of this namespace, enforced by `update`
+        """
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path or os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "biasbreaker_cache.sqlite3"))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets_since_evict = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+        conn.commit()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired."""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, str(key))
+        ).fetchone()
+
+        if row is None or row[1] < now:
+            if row is not None:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, str(key)))
+                conn.commit()
+            self._count("misses")
+            return None
+
+        conn.execute(
+            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, str(key))
+        )
+        conn.commit()
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store `value` under `key`; old entries are evicted every few sets."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, str(key), json.dumps(value), expires_at, now)
+        )
+        conn.commit()
+
+        with self._lock:
+            self._sets_since_evict += 1
+            should_evict = self._sets_since_evict >= self.EVICT_EVERY
+            if should_evict:
+                self._sets_since_evict = 0
+        if should_evict:
+            self.evict()
+
+    def update(self, key: Hashable, fn: Callable[[Optional[Any]], Any], ttl: Optional[float] = None) -> Any:
+        """Replace the value for `key` with `fn(current value)` in one transaction.
+
+        The write lock is taken before the read, so concurrent updates from any
+        worker are applied one after another instead of overwriting each other.
+        `fn` gets None when the key is missing or expired. Entries beyond
+        `max_bytes` are evicted in the same transaction.
+
+        Returns:
+            Any: The value that was stored
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key))
+            ).fetchone()
+            value = fn(json.loads(row[0]) if row is not None and row[1] >= now else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, str(key), json.dumps(value), expires_at, now)
+            )
+            evicted = self._evict_over_bytes(conn) if self.max_bytes else 0
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if evicted:
+            with self._lock:
+                self.stats["evictions"] += evicted
+        return value
+
+    def delete(self, key: Hashable):
+        """Remove `key` from the cache if present."""
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, str(key)))
+        conn.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond `max_entries`."""
+        conn = self._connection()
+        expired = conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time())
+        ).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        excess = max(0, count - self.max_entries)
+        if excess:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, self.namespace, excess)
+            )
+        conn.commit()
+        with self._lock:
+            self.stats["evictions"] += expired + excess
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return this process's hit and miss counters with the shared size."""
+        conn = self._connection()
+        size, size_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+        with self._lock:
+            return dict(self.stats, size=size, bytes=size_bytes)
+
+    def _evict_over_bytes(self, conn: sqlite3.Connection) -> int:
+        total = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, LENGTH(value) FROM cache WHERE namespace = ? ORDER BY accessed_at", (self.namespace,)
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            victims.append((self.namespace, key))
+            total -= size
+        conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", victims)
+        return len(victims)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared across threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def create_cache(namespace: str, max_entries: int = 256, ttl: float = 300.0):
+    """Create a cache using the backend chosen by the CACHE_BACKEND environment variable.
+
+    "sqlite" shares entries between all workers on the node; "memory" (the
+    default) keeps a separate cache in each process.
+    """
+    if os.getenv("CACHE_BACKEND", "memory").lower() == "sqlite":
+        return SQLiteCache(namespace, max_entries=max_entries, ttl=ttl)
+    return TTLCache(max_entries=max_entries, ttl=ttl)
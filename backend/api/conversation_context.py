@@ -0,0 +1,67 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+# Rough characters-per-token ratio for English text; avoids a tokenizer round trip
+CHARS_PER_TOKEN = 4
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens `text` takes up in a prompt."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` at a word boundary so it fits in `max_tokens`."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "..."
+
+
+class ConversationContext:
+    """Builds the conversation part of a prompt under a fixed token budget.
+
+    Only the most recent exchange is kept word for word. Older exchanges are
+    folded into a rolling summary as they age out: each contributes one line
+    with the user's question and the first sentence of the reply, and the
+    oldest lines are dropped once the summary is over its budget. Folding is
+    plain string work, so it adds no LLM call and the prompt stays the same
+    size however long the conversation runs.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, summary_budget: Optional[int] = None):
+        """
+        Args:
+            token_budget (Optional[int]): Tokens for the whole conversation context
+            summary_budget (Optional[int]): Tokens of that budget the rolling summary may use
+        """
+        self.token_budget = token_budget or int(os.getenv("CONVERSATION_TOKEN_BUDGET", "400"))
+        self.summary_budget = summary_budget or int(os.getenv("CONVERSATION_SUMMARY_BUDGET", str(self.token_budget // 2)))
+
+    def fold(self, summary: str, exchange: Dict[str, str]) -> str:
+        """Add an exchange that is aging out to the rolling summary."""
+        reply = SENTENCE_END.split(exchange["response"].strip(), 1)[0]
+        line = f"- User asked: {truncate_to_tokens(exchange['query'].strip(), 30)} / Assistant: {truncate_to_tokens(reply, 40)}"
+        lines = (summary.splitlines() if summary else []) + [line]
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def build(self, summary: str, recent: List[Dict[str, str]]) -> str:
+        """Return the prompt text for the summary and the recent exchanges."""
+        parts = []
+        if summary:
+            parts.append("Summary of earlier conversation:\n" + summary)
+
+        remaining = self.token_budget - sum(estimate_tokens(part) for part in parts)
+        if recent and remaining > 0:
+            text = "Previous conversation:\n" + "\n".join(
+                f"User: {exchange['query']}\nAssistant: {exchange['response']}" for exchange in recent
+            )
+            parts.append(truncate_to_tokens(text, remaining))
+
+        return "\n".join(parts)
@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from api.cache import SQLiteCache
+
+
+class ConversationStore:
+    """Bounded, per-session conversation history.
+
+    Each session keeps only its last `max_exchanges` exchanges. Sessions are
+    held in LRU order and evicted when there are more than `max_sessions`,
+    when their text adds up to more than `max_bytes`, or once they have been
+    idle for `idle_ttl` seconds, so memory stays bounded however many users
+    there are. When a `summarizer` is given, exchanges that age out of the
+    per-session cap are folded into a rolling summary instead of discarded.
+
+    With CONVERSATION_STORE=sqlite the history lives in the node's shared
+    SQLite cache instead, so every uvicorn worker sees the same conversation.
+    Each append there is a single transaction that also applies `max_bytes`.
+    """
+
+    def __init__(self, max_exchanges: Optional[int] = None, max_sessions: Optional[int] = None,
+                 idle_ttl: Optional[float] = None, max_bytes: Optional[int] = None,
+                 persistent: Optional[bool] = None,
+                 summarizer: Optional[Callable[[str, Dict[str, str]], str]] = None):
+        """
+        Args:
+            max_exchanges (Optional[int]): Exchanges remembered per session
+            max_sessions (Optional[int]): Sessions kept before the least recently used is evicted
+            idle_ttl (Optional[float]): Seconds of inactivity after which a session is dropped
+            max_bytes (Optional[int]): Ceiling on the text held across all sessions, counted in characters
+            persistent (Optional[bool]): Keep history in the shared SQLite cache
+            summarizer: Called with (summary, exchange) to fold an aging-out exchange into the summary
+        """
+        self.max_exchanges = max_exchanges or int(os.getenv("CONVERSATION_MAX_EXCHANGES", "5"))
+        self.max_sessions = max_sessions or int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+        self.idle_ttl = idle_ttl or float(os.getenv("CONVERSATION_IDLE_TTL_SECONDS", "3600"))
+        self.max_bytes = max_bytes or int(os.getenv("CONVERSATION_MAX_BYTES", str(64 * 1024 * 1024)))
+        if persistent is None:
+            persistent = os.getenv("CONVERSATION_STORE", "memory").lower() == "sqlite"
+        self.summarizer = summarizer
+
+        self._shared = SQLiteCache("conversations", max_entries=self.max_sessions, ttl=self.idle_ttl,
+                                   max_bytes=self.max_bytes) if persistent else None
+        # session_id -> [last_used, exchanges, size, summary]; least recently used first
+        self._sessions: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "evicted": 0,
+            "expired": 0
+        }
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the session's remembered exchanges, oldest first."""
+        return self.context(session_id)[1]
+
+    def context(self, session_id: str) -> Tuple[str, List[Dict[str, str]]]:
+        """Return the session's rolling summary and its remembered exchanges."""
+        if self._shared is not None:
+            stored = self._shared.get(session_id) or {}
+            return stored.get("summary", ""), stored.get("exchanges", [])
+
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                return "", []
+            session[0] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session[3], list(session[1])
+
+    def append(self, session_id: str, query: str, response: str):
+        """Remember an exchange; the session's oldest one beyond the cap is summarized or dropped."""
+        exchange = {"query": query, "response": response}
+        if self._shared is not None:
+            def add_exchange(stored):
+                stored = stored or {}
+                summary, exchanges = stored.get("summary", ""), stored.get("exchanges", [])
+                exchanges.append(exchange)
+                for dropped in exchanges[:-self.max_exchanges]:
+                    summary = self._fold(summary, dropped)
+                return {"summary": summary, "exchanges": exchanges[-self.max_exchanges:]}
+
+            # Read, fold and write in one transaction, so concurrent workers don't lose exchanges
+            self._shared.update(session_id, add_exchange)
+            return
+
+        size = len(query) + len(response)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = [0.0, deque(maxlen=self.max_exchanges), 0, ""]
+            exchanges = session[1]
+            if len(exchanges) == exchanges.maxlen:
+                dropped = exchanges[0]
+                summary = self._fold(session[3], dropped)
+                size += len(summary) - len(session[3]) - len(dropped["query"]) - len(dropped["response"])
+                session[3] = summary
+            exchanges.append(exchange)
+            session[0] = time.monotonic()
+            session[2] += size
+            self._bytes += size
+            self._sessions.move_to_end(session_id)
+
+            self._expire_idle()
+            while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+                self._pop_oldest()
+                self.stats["evicted"] += 1
+
+    def clear(self, session_id: str):
+        """Forget a session's history."""
+        if self._shared is not None:
+            self._shared.delete(session_id)
+            return
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session[2]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return eviction counters with the current session count and size."""
+        if self._shared is not None:
+            return dict(self._shared.get_stats(), backend="sqlite")
+        with self._lock:
+            return dict(self.stats, sessions=len(self._sessions), bytes=self._bytes, backend="memory")
+
+    def _fold(self, summary: str, exchange: Dict[str, str]) -> str:
+        return self.summarizer(summary, exchange) if self.summarizer else summary
+
+    def _expire_idle(self):
+        # Sessions are in last-used order, so idle ones are all at the front
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest[0] >= cutoff:
+                break
+            self._pop_oldest()
+            self.stats["expired"] += 1
+
+    def _pop_oldest(self):
+        _, session = self._sessions.popitem(last=False)
+        self._bytes -= session[2]
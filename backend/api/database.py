@@ -1,12 +1,14 @@
 import os
+import re
+import hashlib
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import json
 import logging
+from datetime import datetime
 from typing import Dict, Any, List, Optional
+from api.analysis_buffer import AnalysisWriteBuffer
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -35,7 +37,8 @@ class Database:
         if cls._instance:
             cls._instance.client = client
             cls._instance.is_connected = True
-            cls._instance.tables_exist = cls._instance._check_tables_exist()
+            # Probe the tables again on next use with the new client
+            cls._instance._tables_exist = None
             logger.info("Using FastAPI backend's Supabase client")
     
     def _initialize(self):
@@ -57,10 +60,24 @@ class Database:
             
         self.is_connected = True
         self.table_prefix = ""  # No prefix, use the exact table name
-        self.tables_exist = self._check_tables_exist()
+        # The table probe is a network round trip, so it runs on first use rather than at construction
+        self._tables_exist = None
         
-        if not self.tables_exist:
-            logger.warning("Required tables do not exist in Supabase. Run the init_db.py script to create them.")
+        # Analysis results are audit rows nobody waits on, so they are written behind the request
+        self.analysis_buffer = AnalysisWriteBuffer(self._insert_analysis_results)
+    
+    @property
+    def tables_exist(self) -> bool:
+        """Whether the required tables exist, checked once on first access."""
+        if self._tables_exist is None:
+            self._tables_exist = self._check_tables_exist()
+            if not self._tables_exist:
+                logger.warning("Required tables do not exist in Supabase. Run the init_db.py script to create them.")
+        return self._tables_exist
+    
+    @tables_exist.setter
+    def tables_exist(self, value: bool):
+        self._tables_exist = value
     
     def _check_tables_exist(self) -> bool:
         """Check if the required tables exist in the database."""
@@ -134,24 +151,95 @@ class Database:
             logger.error(f"Error fetching previous analyses: {str(e)}")
             return []
     
-    def save_analysis_result(self, query: str, result: Dict[str, Any], module: str) -> bool:
-        """Save analysis results to the database."""
+    def fetch_analysis(self, module: str, article_id: Optional[str] = None,
+                       content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fetch the latest analysis result for an article in one indexed query.
+        
+        When a content hash is given it must match, so an article whose body has
+        changed since it was analyzed is not served the old analysis; the article
+        ID is only used on its own when no hash is given.
+        
+        Args:
+            module (str): The module name to filter by
+            article_id (Optional[str]): ID of the analyzed article
+            content_hash (Optional[str]): Hash from `content_hash` of the analyzed text
+            
+        Returns:
+            Optional[Dict[str, Any]]: The most recent matching analysis result or None
+        """
         if not self.tables_exist:
-            logger.warning("Skipping save_analysis_result: Tables don't exist yet")
-            return False
+            logger.warning("Skipping fetch_analysis: Tables don't exist yet")
+            return None
+        if article_id is None and content_hash is None:
+            return None
             
         try:
-            data = {
-                'query': query,
-                'result': json.dumps(result),
-                'module': module,
-                'created_at': 'now()'
-            }
-            response = self.client.table("analysis_results").insert(data).execute()
-            return len(response.data) > 0
+            request = self.client.table("analysis_results") \
+                .select('*') \
+                .eq('module', module)
+            if content_hash is not None:
+                request = request.eq('content_hash', content_hash)
+            else:
+                request = request.eq('article_id', str(article_id))
+            response = request.order('created_at', desc=True).limit(1).execute()
+            if response.data and len(response.data) > 0:
+                return response.data[0]
+            return None
         except Exception as e:
-            logger.error(f"Error saving analysis result: {str(e)}")
+            logger.error(f"Error fetching analysis: {str(e)}")
+            return None
+    
+    @staticmethod
+    def content_hash(*parts: str) -> str:
+        """Hash the given text parts, ignoring case and whitespace differences."""
+        normalized = "\n".join(re.sub(r'\s+', ' ', part or '').strip().lower() for part in parts)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    
+    def save_analysis_result(self, query: str, result: Dict[str, Any], module: str,
+                             article_id: Optional[str] = None,
+                             content_hash: Optional[str] = None) -> bool:
+        """Queue analysis results for a bulk insert into the database.
+        
+        The row is written by the analysis write buffer in the background, so
+        callers never wait on the insert.
+        
+        Args:
+            query (str): The analyzed title or query text
+            result (Dict[str, Any]): The analysis result
+            module (str): The module that produced the result
+            article_id (Optional[str]): ID of the analyzed article, if known
+            content_hash (Optional[str]): Lookup key for `fetch_analysis`; defaults to a hash of `query`
+            
+        Returns:
+            bool: True if the result was accepted by the buffer
+        """
+        if not self.tables_exist:
+            logger.warning("Skipping save_analysis_result: Tables don't exist yet")
             return False
+            
+        data = {
+            'query': query,
+            'result': json.dumps(result),
+            'module': module,
+            'article_id': str(article_id) if article_id is not None else None,
+            'content_hash': content_hash or self.content_hash(query),
+            'created_at': datetime.utcnow().isoformat()
+        }
+        return self.analysis_buffer.add(data)
+    
+    def flush_analysis_results(self) -> int:
+        """Write any buffered analysis results immediately."""
+        return self.analysis_buffer.flush()
+    
+    def _insert_analysis_results(self, rows: List[Dict[str, Any]]):
+        """Insert a batch of analysis results in a single request."""
+        self.client.table("analysis_results").insert(rows).execute()
+    
+    @classmethod
+    def shutdown(cls):
+        """Flush buffered writes if a database instance was created."""
+        if cls._instance is not None:
+            cls._instance.analysis_buffer.close()
     
     def fetch_user_settings(self, user_id: str) -> Dict[str, Any]:
         """Fetch user customization settings."""
@@ -5,9 +5,8 @@ from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
 import os
 from api.database import Database
+from api.llm_cache import CachedLLMClient
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -18,7 +17,7 @@ class DEIFocus:
         """
         Initialize the DEI Focus module with Cohere API key.
         """
-        self.client = cohere.Client(os.getenv('COHERE_API_KEY'))
+        self.client = CachedLLMClient(cohere.Client(os.getenv('COHERE_API_KEY')), "dei_focus")
         self.db = Database()
 
     def fetch_article_with_analysis(self, article_id: Optional[str] = None) -> Dict[str, Any]:
@@ -56,6 +55,7 @@ class DEIFocus:
         
         # Format article data
         formatted_article = {
+            "article_id": article.get('id'),
             "main_article": {
                 "title": article.get('title', ''),
                 "body": article.get('content', article.get('body', ''))
@@ -64,32 +64,18 @@ class DEIFocus:
         
         # Try to fetch analysis results for this article from the database
         try:
-            # Try to find an underrepresented_voices analysis for this article
-            prev_analyses = self.db.fetch_previous_analyses("underrepresented_voices", 10)
-            
-            # Look for analysis with a matching title
+            # Look up the underrepresented_voices analysis by article ID or content hash
             underrepresented_data = None
-            article_title = formatted_article["main_article"]["title"]
-            
-            for analysis in prev_analyses:
-                if analysis["query"].lower() == article_title.lower():
-                    # Found a matching analysis
-                    underrepresented_data = json.loads(analysis["result"])
-                    logger.info(f"Found matching underrepresented voices analysis")
-                    break
+            main_article = formatted_article["main_article"]
+            analysis = self.db.fetch_analysis(
+                "underrepresented_voices",
+                article_id=formatted_article["article_id"],
+                content_hash=self.db.content_hash(main_article["title"], main_article["body"])
+            )
             
-            # If no exact match, check for similar titles
-            if not underrepresented_data and prev_analyses:
-                import difflib
-                similarities = [(difflib.SequenceMatcher(None, article_title.lower(), a["query"].lower()).ratio(), a) for a in prev_analyses]
-                best_match = max(similarities, key=lambda x: x[0])
-                if best_match[0] > 0.6:  # If similarity is greater than 60%
-                    underrepresented_data = json.loads(best_match[1]["result"])
-                    logger.info(f"Using underrepresented voices analysis from similar article (similarity: {best_match[0]:.2f})")
-                else:
-                    # Use the most recent analysis as a fallback
-                    underrepresented_data = json.loads(prev_analyses[0]["result"])
-                    logger.info(f"Using most recent underrepresented voices analysis as fallback")
+            if analysis:
+                underrepresented_data = json.loads(analysis["result"])
+                logger.info(f"Found matching underrepresented voices analysis")
             
             # If we found analysis data, add it to the formatted article
             if underrepresented_data:
@@ -198,7 +184,12 @@ class DEIFocus:
             self.db.save_analysis_result(
                 article_data['main_article']['title'],
                 result,
-                "dei_focus"
+                "dei_focus",
+                article_id=article_data.get('article_id'),
+                content_hash=self.db.content_hash(
+                    article_data['main_article']['title'],
+                    article_data['main_article']['body']
+                )
             )
         
             return result
@@ -206,41 +197,20 @@ class DEIFocus:
         except Exception as e:
             logger.error(f"Error calling Cohere API: {str(e)}")
             
-            # Try to get a similar DEI focus analysis from the database
+            # Try to get a DEI focus analysis of the same article from the database
             try:
-                prev_analyses = self.db.fetch_previous_analyses("dei_focus", 5)
-                if prev_analyses:
-                    # Look for a similar article title
-                    article_title = article_data['main_article']['title']
-                    
-                    # Check for exact match first
-                    exact_match = None
-                    for analysis in prev_analyses:
-                        if analysis["query"].lower() == article_title.lower():
-                            exact_match = analysis
-                            break
-                    
-                    if exact_match:
-                        prev_result = json.loads(exact_match["result"])
-                        logger.info(f"Using DEI focus analysis from matching article")
-                        return prev_result
-                    
-                    # Look for similar title
-                    import difflib
-                    similarities = [(difflib.SequenceMatcher(None, article_title.lower(), a["query"].lower()).ratio(), a) for a in prev_analyses]
-                    best_match = max(similarities, key=lambda x: x[0])
-                    
-                    if best_match[0] > 0.5:  # If similarity is greater than 50%
-                        prev_result = json.loads(best_match[1]["result"])
-                        logger.info(f"Using DEI focus analysis from similar article (similarity: {best_match[0]:.2f})")
-                        return prev_result
-                    
-                    # Use most recent as fallback
-                    prev_result = json.loads(prev_analyses[0]["result"])
-                    logger.info(f"Using most recent DEI focus analysis as fallback")
+                main_article = article_data['main_article']
+                analysis = self.db.fetch_analysis(
+                    "dei_focus",
+                    article_id=article_data.get('article_id'),
+                    content_hash=self.db.content_hash(main_article['title'], main_article['body'])
+                )
+                if analysis:
+                    prev_result = json.loads(analysis["result"])
+                    logger.info(f"Using DEI focus analysis from matching article")
                     return prev_result
                 
-                # If no previous analyses, create a minimal result
+                # If no matching analysis, create a minimal result
                 return {
                     "updated_article": {
                         "title": article_data['main_article']['title'],
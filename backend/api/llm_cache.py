@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+from api.cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+# Modules listed here (comma-separated) always call the LLM, for example when varied output matters
+DISABLED_MODULES = {m.strip() for m in os.getenv("LLM_CACHE_DISABLED_MODULES", "").split(",") if m.strip()}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> SQLiteCache:
+    """Return the process-wide LLM response cache, creating it on first use.
+
+    Responses are stored on disk (LLM_CACHE_PATH) so they survive restarts and
+    are shared by every worker on the node.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "biasbreaker", "llm_cache.sqlite3"))
+                _cache = SQLiteCache(
+                    "llm",
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+                    ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60))),
+                    path=path
+                )
+    return _cache
+
+
+class CachedChatResponse:
+    """Stand-in for a Cohere chat response served from the cache."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CachedGeneration:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CachedGenerateResponse:
+    """Stand-in for a Cohere generate response served from the cache."""
+
+    def __init__(self, text: str):
+        self.generations = [CachedGeneration(text)]
+
+
+class CachedLLMClient:
+    """Wraps a Cohere client so identical `chat` and `generate` calls are answered from disk.
+
+    Calls are keyed by a hash of the endpoint, the prompt and every other
+    argument, so calls that differ in chat_history, preamble or sampling
+    settings never share a reply. Caching can be turned off for a whole module
+    (`enabled=False` or LLM_CACHE_DISABLED_MODULES) or for a single call by
+    passing `cache=False`. Any other attribute is passed through to the client.
+    """
+
+    def __init__(self, client: Any, module: str, enabled: bool = True):
+        """
+        Args:
+            client: The Cohere client to wrap
+            module (str): Name of the calling module, used for opt-out
+            enabled (bool): Whether this module's calls are cached by default
+        """
+        self.client = client
+        self.module = module
+        self.enabled = enabled and module not in DISABLED_MODULES
+
+    def chat(self, cache: Optional[bool] = None, **kwargs):
+        """Call `client.chat`, or return the cached text of an identical earlier call.
+
+        Streamed calls (`stream=True`) always go to the client.
+        """
+        if not self._use_cache(cache) or kwargs.get("stream"):
+            return self.client.chat(**kwargs)
+
+        key = self._key("chat", kwargs.get("model"), kwargs.get("message"), kwargs)
+        text = self._lookup(key)
+        if text is not None:
+            return CachedChatResponse(text)
+        response = self.client.chat(**kwargs)
+        self._store(key, response.text)
+        return response
+
+    def generate(self, cache: Optional[bool] = None, **kwargs):
+        """Call `client.generate`, or return the cached text of an identical earlier call."""
+        if not self._use_cache(cache) or kwargs.get("num_generations", 1) != 1:
+            return self.client.generate(**kwargs)
+
+        key = self._key("generate", kwargs.get("model"), kwargs.get("prompt"), kwargs)
+        text = self._lookup(key)
+        if text is not None:
+            return CachedGenerateResponse(text)
+        response = self.client.generate(**kwargs)
+        self._store(key, response.generations[0].text)
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+    def _use_cache(self, cache: Optional[bool]) -> bool:
+        return self.enabled if cache is None else cache
+
+    @staticmethod
+    def _key(endpoint: str, model: Optional[str], prompt: Optional[str], kwargs: Dict[str, Any]) -> str:
+        material = json.dumps({
+            "endpoint": endpoint,
+            "model": model,
+            "prompt": prompt,
+            # Everything else that shapes the reply: chat_history, preamble, sampling settings...
+            "arguments": kwargs
+        }, sort_keys=True, default=lambda value: getattr(value, "__dict__", str(value)))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        try:
+            return get_llm_cache().get(key)
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {str(e)}")
+            return None
+
+    def _store(self, key: str, text: str):
+        try:
+            get_llm_cache().set(key, text)
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {str(e)}")
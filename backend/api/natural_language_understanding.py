@@ -1,13 +1,21 @@
 import cohere
 import json
 import requests
-from typing import Dict, Any, List
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
 from dotenv import load_dotenv
 import os
+import uuid
 import logging
+from api.llm_cache import CachedLLMClient
+from api.conversation_store import ConversationStore
+from api.conversation_context import ConversationContext, truncate_to_tokens
+from api.cache import create_cache
+from api.database import Database
+from api.singleflight import normalize_query
+from api.topic_classifier import TopicClassifier, TOKEN_PATTERN
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -15,29 +23,76 @@ load_dotenv()
 
 # FastAPI backend URL
 BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:8000')
+# Matches per keyword requested from /search
+SEARCH_PAGE_SIZE = 20
+# Topics a query can be classified into, with the keywords used when none can be extracted
+TOPICS = ("renewable energy", "business impact", "environment", "artificial intelligence", "general")
+DEFAULT_KEYWORDS = {
+    "artificial intelligence": ("artificial intelligence", "machine learning"),
+    "renewable energy": ("renewable energy", "sustainability"),
+    "business impact": ("economics", "business"),
+    "environment": ("environment", "climate"),
+    "general": ("general", "information")
+}
+MAX_KEYWORDS = 5
+# The local topic classifier answers on its own at or above this confidence
+TOPIC_CONFIDENCE_THRESHOLD = float(os.getenv('TOPIC_CONFIDENCE_THRESHOLD', '0.8'))
+# Words left out of keywords extracted without the LLM
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with", "about", "from", "by",
+    "is", "are", "was", "were", "be", "been", "do", "does", "did", "has", "have", "had", "can", "could",
+    "will", "would", "should", "what", "whats", "which", "who", "how", "why", "when", "where", "this", "that",
+    "these", "those", "it", "its", "me", "my", "i", "you", "your", "we", "our", "they", "their", "tell",
+    "news", "latest", "new", "any", "some", "there", "s"
+}
+# Articles included in the response prompt
+MAX_PROMPT_ARTICLES = int(os.getenv('MAX_PROMPT_ARTICLES', '8'))
+NO_INFORMATION_RESPONSE = "I'm sorry, I don't have any information about that in my database. Could you try asking about something else?"
+RESPONSE_ERROR_MESSAGE = "I found some information about that, but I'm having trouble processing it. Could you try asking in a different way?"
+# Concurrent requests (and pooled connections) to the backend
+HTTP_POOL_SIZE = int(os.getenv('NLU_HTTP_POOL_SIZE', '8'))
+# Default session_id: the conversation of this instance, for command-line chats
+# run in a single process. The API passes an explicit session id, or None.
+LOCAL_SESSION = "local"
 
 class NaturalLanguageUnderstanding:
     def __init__(self):
         """
         Initialize the Natural Language Understanding module with Cohere API key.
         """
-        self.client = cohere.Client(os.getenv('COHERE_API_KEY'))
-        # Add conversation history to maintain context
-        self.conversation_history = []
-        # Max number of exchanges to remember
-        self.max_history_length = 5
+        self.client = CachedLLMClient(cohere.Client(os.getenv('COHERE_API_KEY')), "natural_language_understanding")
+        # One keep-alive connection pool for every call to the backend
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        # Runs keyword searches concurrently and analysis saves in the background
+        self.executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="nlu-http")
+        # Topic and keywords of recent queries, keyed by the normalized query
+        self.analysis_cache = create_cache("query_analysis", max_entries=1024, ttl=float(os.getenv("QUERY_ANALYSIS_CACHE_TTL_SECONDS", "3600")))
+        # Answers most topic questions locally; trained from stored analyses in the background
+        self.topic_classifier = TopicClassifier(TOPICS)
+        self.executor.submit(self._train_topic_classifier)
+        # Conversation history per session: the last exchange verbatim, older ones as a rolling summary
+        self.context_builder = ConversationContext()
+        self.conversations = ConversationStore(max_exchanges=1, summarizer=self.context_builder.fold)
+        # Unique per instance, since the conversation store can be shared between processes
+        self.local_session_id = f"local:{uuid.uuid4().hex}"
 
-    def process_query(self, query: str) -> Dict[str, Any]:
+    def process_query(self, query: str, session_id: Optional[str] = LOCAL_SESSION) -> Dict[str, Any]:
         """
         Process a user query using Cohere's API to provide a conversational response
         and retrieve relevant news articles.
         
         Args:
             query (str): The user query
+            session_id (Optional[str]): Conversation the query belongs to, e.g. the user's id; None keeps no
+                history, and the default is this instance's own conversation
             
         Returns:
             Dict[str, Any]: Response containing chatbot message and relevant articles
         """
+        session_id = self._resolve_session(session_id)
         try:
             logger.debug(f"Processing query: {query}")
             
@@ -49,18 +104,12 @@ class NaturalLanguageUnderstanding:
             
             # Only generate a response if we found relevant articles
             if articles:
-                response = self._generate_response(query, analysis, articles)
+                summary, recent = self.conversations.context(session_id) if session_id is not None else ("", [])
+                response = self._generate_response(query, analysis, articles, self.context_builder.build(summary, recent))
             else:
-                response = "I'm sorry, I don't have any information about that in my database. Could you try asking about something else?"
+                response = NO_INFORMATION_RESPONSE
             
-            # Add to conversation history
-            self._update_conversation_history(query, response)
-            
-            # Save the analysis result to the database via FastAPI backend
-            try:
-                self._save_analysis_result(query, analysis)
-            except Exception as e:
-                logger.error(f"Error saving to database: {str(e)}")
+            self._finish_query(query, session_id, analysis, response)
             
             return {
                 "analysis": analysis,
@@ -77,149 +126,196 @@ class NaturalLanguageUnderstanding:
                     "keywords": ["error"]
                 },
                 "articles": [],
-                "response": "I'm sorry, I don't have any information about that in my database. Could you try asking about something else?"
+                "response": NO_INFORMATION_RESPONSE
             }
     
+    def process_query_stream(self, query: str, session_id: Optional[str] = LOCAL_SESSION) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of `process_query`.
+        
+        Yields the analysis and the matching articles as soon as they are known,
+        then the chatbot response as it is generated, so the caller can show
+        something at time-to-first-token instead of after the full completion.
+        
+        Args:
+            query (str): The user query
+            session_id (Optional[str]): Conversation the query belongs to, as for `process_query`
+            
+        Yields:
+            Dict[str, Any]: Events of type "analysis", "articles", "token" (one
+            chunk of the response) and finally "done" with the full response
+        """
+        session_id = self._resolve_session(session_id)
+        try:
+            analysis = self._analyze_query(query)
+            yield {"type": "analysis", "analysis": analysis}
+            
+            articles = self._search_articles_by_keywords(analysis['keywords'])
+            yield {"type": "articles", "articles": articles}
+        except Exception as e:
+            logger.error(f"Unexpected error in process_query_stream: {str(e)}")
+            yield {"type": "done", "response": NO_INFORMATION_RESPONSE}
+            return
+        
+        if articles:
+            summary, recent = self.conversations.context(session_id) if session_id is not None else ("", [])
+            chunks = []
+            for chunk in self._stream_response(query, analysis, articles, self.context_builder.build(summary, recent)):
+                chunks.append(chunk)
+                yield {"type": "token", "text": chunk}
+            response = "".join(chunks).strip()
+        else:
+            response = NO_INFORMATION_RESPONSE
+        
+        self._finish_query(query, session_id, analysis, response)
+        yield {"type": "done", "response": response}
+    
+    def _resolve_session(self, session_id: Optional[str]) -> Optional[str]:
+        return self.local_session_id if session_id == LOCAL_SESSION else session_id
+    
+    def _finish_query(self, query: str, session_id: Optional[str], analysis: Dict[str, Any], response: str):
+        """
+        Record a finished exchange in the conversation and save its analysis.
+        """
+        # Add to conversation history
+        if session_id is not None:
+            self.conversations.append(session_id, query, response)
+        
+        # Save the analysis result via FastAPI backend without holding up the response
+        try:
+            self.executor.submit(self._save_analysis_result, query, analysis)
+        except Exception as e:
+            logger.error(f"Error saving to database: {str(e)}")
+    
     def _analyze_query(self, query: str) -> Dict[str, Any]:
         """
-        Analyze the query to extract topic and keywords.
+        Analyze the query to extract topic and keywords with a single structured chat call.
+        Results are cached per normalized query. Each analysis records its
+        "label_source": "llm", "classifier", or "default" when neither answered,
+        so only LLM labels are used to train the classifier.
         """
+        cache_key = normalize_query(query)
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached, keywords=list(cached["keywords"]))
+        
+        # Confident local classifications skip the LLM entirely
+        topic, confidence = self.topic_classifier.predict(query)
+        if confidence >= TOPIC_CONFIDENCE_THRESHOLD:
+            analysis = {
+                "topic": topic,
+                "keywords": self._local_keywords(query) or list(DEFAULT_KEYWORDS[topic]),
+                "label_source": "classifier"
+            }
+            self.analysis_cache.set(cache_key, analysis)
+            return analysis
+        
         try:
-            # Use Cohere's chat API for topic classification
-            topic_prompt = f"""Analyze this query and determine the main topic. Choose from these options:
-            - renewable energy
-            - business impact
-            - environment
-            - artificial intelligence
-            - general
+            analysis_prompt = f"""Analyze this query. Pick its main topic from these options:
+            {", ".join(TOPICS)}
+            and extract up to 5 of its most important search keywords.
             
-            Format your response as just the topic name, nothing else.
+            Respond with ONLY a JSON object and no other text, in exactly this format:
+            {{"topic": "<one of the options>", "keywords": ["keyword1", "keyword2"]}}
             
             Query: {query}"""
             
-            topic_response = self.client.chat(
-                message=topic_prompt,
-                model="command", 
+            analysis_response = self.client.chat(
+                message=analysis_prompt,
+                model="command",
                 temperature=0.3
             )
-            
-            # Extract just the topic name
-            topic = topic_response.text.strip().lower()
-            
-            # Make sure we're only taking the first line, and removing any extra text
-            if '\n' in topic:
-                topic = topic.split('\n')[0]
-            
-            # Standardize common responses
-            if 'artificial' in topic or 'ai' in topic or 'machine learning' in topic:
-                topic = "artificial intelligence"
-            elif 'renewable' in topic or 'energy' in topic:
-                topic = "renewable energy"
-            elif 'business' in topic or 'economic' in topic:
-                topic = "business impact"
-            elif 'environment' in topic or 'climate' in topic:
-                topic = "environment"
-            elif topic not in ["renewable energy", "business impact", "environment", "artificial intelligence"]:
-                topic = "general"
+            analysis = dict(self._parse_analysis(analysis_response.text), label_source="llm")
+            self.analysis_cache.set(cache_key, analysis)
+            self.topic_classifier.learn(query, analysis["topic"])
+            return analysis
             
         except Exception as e:
-            logger.error(f"Error calling chat API for topic: {str(e)}")
-            # Fall back to database for similar queries
-            try:
-                prev_analyses = self._fetch_previous_analyses("natural_language_understanding", 5)
-                if prev_analyses:
-                    # Find the most similar previous query
-                    import difflib
-                    similarities = [(difflib.SequenceMatcher(None, query.lower(), a['query'].lower()).ratio(), a) for a in prev_analyses]
-                    best_match = max(similarities, key=lambda x: x[0])
-                    if best_match[0] > 0.6:  # If similarity is greater than 60%
-                        result_data = json.loads(best_match[1]['result'])
-                        topic = result_data.get('topic', 'general')
-                        logger.info(f"Using topic from similar previous query: {topic}")
-                    else:
-                        topic = "general"
-                else:
+            logger.error(f"Error analyzing query with chat API: {str(e)}")
+        
+        # Fall back to a previous analysis of the same query
+        topic = "general"
+        try:
+            prev_analysis = self._fetch_previous_analysis("natural_language_understanding", query)
+            if prev_analysis:
+                result_data = json.loads(prev_analysis['result'])
+                topic = result_data.get('topic', 'general')
+                if topic not in TOPICS:
                     topic = "general"
-            except Exception as db_err:
-                logger.error(f"Error fetching from database: {str(db_err)}")
-                topic = "general"
+                logger.info(f"Using topic from previous analysis of this query: {topic}")
+                if result_data.get('keywords'):
+                    return {
+                        "topic": topic,
+                        "keywords": result_data['keywords'][:MAX_KEYWORDS],
+                        "label_source": result_data.get('label_source', 'default')
+                    }
+        except Exception as db_err:
+            logger.error(f"Error fetching from database: {str(db_err)}")
         
-        # Extract keywords
+        return {
+            "topic": topic,
+            "keywords": list(DEFAULT_KEYWORDS[topic]),
+            "label_source": "default"
+        }
+    
+    @staticmethod
+    def _local_keywords(query: str) -> List[str]:
+        """
+        Extract keywords from the query itself, for analyses that don't go through the LLM.
+        """
+        words = [w for w in TOKEN_PATTERN.findall(query.lower()) if w not in STOPWORDS and len(w) > 2]
+        return list(dict.fromkeys(words))[:MAX_KEYWORDS]
+    
+    def _train_topic_classifier(self):
+        """
+        Train the topic classifier on analyses stored by earlier runs.
+        
+        Rows are read from the database directly rather than through a public
+        route, and only LLM-labelled rows are used: training on the
+        classifier's own predictions would reinforce its mistakes.
+        """
         try:
-            # Use chat API for keyword extraction
-            keywords_prompt = f"""Extract the most important keywords from this query as a comma-separated list:
-            
-            Query: {query}
-            
-            Format your response as JUST the keywords, separated by commas. Don't include any other text.
-            Example: keyword1, keyword2, keyword3
-            """
-            
-            keywords_response = self.client.chat(
-                message=keywords_prompt,
-                model="command",
-                temperature=0.3
-            )
-            
-            # Extract keywords as a list
-            keywords_text = keywords_response.text.strip()
-            # Cleanup response - remove common prefixes 
-            prefixes_to_remove = [
-                "here are the most important keywords", 
-                "here are the keywords", 
-                "the keywords are", 
-                "sure", 
-                "certainly"
-            ]
-            for prefix in prefixes_to_remove:
-                if keywords_text.lower().startswith(prefix):
-                    # Find the first colon or comma after the prefix
-                    colon_pos = keywords_text.find(":")
-                    if colon_pos > 0:
-                        keywords_text = keywords_text[colon_pos+1:].strip()
-            
-            # Only take the first line if there are multiple
-            if '\n' in keywords_text:
-                keywords_text = keywords_text.split('\n')[0]
-                
-            keywords = [k.strip() for k in keywords_text.split(',') if k.strip()]
-            
-            # Filter out likely non-keywords
-            keywords = [k for k in keywords if len(k) > 1 and ":" not in k and not k.startswith("format")]
-            
-            # Limit to a maximum of 5 keywords
-            keywords = keywords[:5]
-            
-            # If no keywords were extracted, provide defaults based on topic
-            if not keywords:
-                if topic == "artificial intelligence":
-                    keywords = ["artificial intelligence", "machine learning"]
-                elif topic == "renewable energy":
-                    keywords = ["renewable energy", "sustainability"]
-                elif topic == "business impact":
-                    keywords = ["economics", "business"]
-                elif topic == "environment":
-                    keywords = ["environment", "climate"]
-                else:
-                    keywords = ["general", "information"]
+            for row in Database().fetch_previous_analyses("natural_language_understanding", limit=1000):
+                try:
+                    result = json.loads(row['result'])
+                except (TypeError, ValueError):
+                    continue
+                if not isinstance(result, dict) or result.get('label_source') != 'llm':
+                    continue
+                self.topic_classifier.learn(row.get('query', ''), result.get('topic'))
+            logger.debug(f"Topic classifier trained: {self.topic_classifier.get_stats()}")
             
         except Exception as e:
-            logger.error(f"Error calling chat API for keywords: {str(e)}")
-            # Default keywords based on topic
-            if topic == "artificial intelligence":
-                keywords = ["artificial intelligence", "machine learning"]
-            elif topic == "renewable energy":
-                keywords = ["renewable energy", "sustainability"]
-            elif topic == "business impact":
-                keywords = ["economics", "business"]
-            elif topic == "environment":
-                keywords = ["environment", "climate"]
-            else:
-                keywords = ["general", "information"]
+            logger.error(f"Error training topic classifier: {str(e)}")
+    
+    def _parse_analysis(text: str) -> Dict[str, Any]:
+        """
+        Parse the structured analysis response.
         
+        Raises:
+            ValueError: If the response is not a JSON object with a known topic and a list of keywords
+        """
+        # Models sometimes wrap the object in a code fence or a sentence; take the outermost braces
+        start = text.find("{")
+        end = text.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError(f"No JSON object in analysis response: {text[:100]!r}")
+        data = json.loads(text[start:end + 1])
+        
+        if not isinstance(data, dict):
+            raise ValueError("Analysis response is not a JSON object")
+        topic = data.get("topic")
+        if not isinstance(topic, str) or topic.strip().lower() not in TOPICS:
+            raise ValueError(f"Unknown topic in analysis response: {topic!r}")
+        keywords = data.get("keywords")
+        if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            raise ValueError("Keywords in analysis response are not a list of strings")
+        
+        topic = topic.strip().lower()
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if len(k.strip()) > 1))[:MAX_KEYWORDS]
         return {
             "topic": topic,
-            "keywords": keywords
+            "keywords": keywords or list(DEFAULT_KEYWORDS[topic])
         }
     
     def _search_articles_by_keywords(self, keywords: List[str]) -> List[Dict[str, Any]]:
@@ -234,51 +330,27 @@ class NaturalLanguageUnderstanding:
         matched_article_ids = set()
         
         try:
-            # Search for each keyword individually using the dedicated search endpoint
-            for keyword in keywords:
-                try:
-                    logger.debug(f"Searching for keyword: {keyword}")
-                    response = requests.get(
-                        f"{BACKEND_URL}/search?query={keyword}", 
-                        timeout=5
-                    )
+            # Search for every keyword at once; results are merged in keyword order
+            for keyword, articles in zip(keywords, self.executor.map(self._search_keyword, keywords)):
+                # Add each matching article to our result set
+                for article in articles:
+                    article_id = article.get('id')
                     
-                    if response.status_code != 200:
-                        logger.error(f"Error searching for keyword '{keyword}': {response.status_code}")
+                    # Skip if we've already matched this article
+                    if article_id in matched_article_ids:
                         continue
                         
-                    articles = response.json()
-                    logger.debug(f"Found {len(articles)} articles matching keyword '{keyword}'")
+                    source_name = article.get('source_name', '')
+                    snippet = article.get('snippet', '')
                     
-                    # Add each matching article to our result set
-                    for article in articles:
-                        article_id = article.get('id')
-                        
-                        # Skip if we've already matched this article
-                        if article_id in matched_article_ids:
-                            continue
-                            
-                        source_name = article.get('source_name', '')
-                        news_information = article.get('news_information', '')
-                        
-                        # Add to our results
-                        matched_article_ids.add(article_id)
-                        relevant_articles.append({
-                            'id': article_id,
-                            'title': source_name,
-                            'summary': news_information[:200] + '...' if news_information and len(news_information) > 200 else news_information,
-                            'relevance': f"Matches keyword: '{keyword}'"
-                        })
-                        
-                except requests.exceptions.ConnectionError:
-                    logger.error(f"Could not connect to the backend at {BACKEND_URL}. Is the server running?")
-                    continue
-                except requests.exceptions.Timeout:
-                    logger.error(f"Request to {BACKEND_URL}/search timed out after 5 seconds")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error searching for keyword '{keyword}': {str(e)}")
-                    continue
+                    # Add to our results
+                    matched_article_ids.add(article_id)
+                    relevant_articles.append({
+                        'id': article_id,
+                        'title': source_name,
+                        'summary': snippet + '...' if len(snippet) >= 200 else snippet,
+                        'relevance': f"Matches keyword: '{keyword}'"
+                    })
             
             logger.debug(f"Total relevant articles found: {len(relevant_articles)}")
             
@@ -293,59 +365,67 @@ class NaturalLanguageUnderstanding:
         
         return relevant_articles
     
+    def _search_keyword(self, keyword: str) -> List[Dict[str, Any]]:
+        """
+        Search for a single keyword with the backend's search endpoint.
+        Returns an empty list if the request fails.
+        """
+        try:
+            logger.debug(f"Searching for keyword: {keyword}")
+            # Only the fields used by the caller are sent back, with the body cut to a snippet
+            response = self.http.get(
+                f"{BACKEND_URL}/search",
+                params={"query": keyword, "fields": "id,source_name,snippet", "limit": SEARCH_PAGE_SIZE},
+                timeout=5
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"Error searching for keyword '{keyword}': {response.status_code}")
+                return []
+                
+            articles = response.json()["articles"]
+            logger.debug(f"Found {len(articles)} articles matching keyword '{keyword}'")
+            return articles
+            
+        except requests.exceptions.ConnectionError:
+            logger.error(f"Could not connect to the backend at {BACKEND_URL}. Is the server running?")
+            return []
+        except requests.exceptions.Timeout:
+            logger.error(f"Request to {BACKEND_URL}/search timed out after 5 seconds")
+            return []
+        except Exception as e:
+            logger.error(f"Error searching for keyword '{keyword}': {str(e)}")
+            return []
+    
     def _fallback_article_search(self, keywords: List[str]) -> List[Dict[str, Any]]:
         """
-        Fallback method to get all articles and filter them by keywords.
-        Used when the search endpoint fails.
+        Fallback method that matches all keywords at once on the backend.
+        Used when the per-keyword search endpoint fails.
         """
         logger.debug("Using fallback article search method")
         relevant_articles = []
-        matched_article_ids = set()
         
         try:
-            # Get all news articles from the backend
-            response = requests.get(f"{BACKEND_URL}/news", timeout=5)
+            response = self.http.get(
+                f"{BACKEND_URL}/search/match",
+                params={"keyword": keywords, "limit": SEARCH_PAGE_SIZE},
+                timeout=5
+            )
             
             if response.status_code != 200:
-                logger.error(f"Error fetching articles from backend: {response.status_code}")
+                logger.error(f"Error matching articles on backend: {response.status_code}")
                 return self._get_mock_articles_for_keywords(keywords)
             
-            articles = response.json()
-            logger.debug(f"Retrieved {len(articles)} articles for manual filtering")
+            articles = response.json()["articles"]
             
-            # If no articles were returned, use mock data
-            if not articles:
-                logger.warning(f"No articles returned from backend, using mock data")
-                return self._get_mock_articles_for_keywords(keywords)
-            
-            # Filter articles based on keywords
             for article in articles:
-                # Extract article fields
-                article_id = article.get('id')
-                source_name = article.get('source_name', '')
-                news_information = article.get('news_information', '')
-                
-                # Skip if we've already matched this article
-                if article_id in matched_article_ids:
-                    continue
-                
-                # Focus on searching in the news_information column
-                article_text = news_information.lower() if news_information else ""
-                matching_keywords = []
-                
-                for keyword in keywords:
-                    if keyword.lower() in article_text:
-                        matching_keywords.append(keyword)
-                
-                # If we found matches, add this article to our results
-                if matching_keywords:
-                    matched_article_ids.add(article_id)
-                    relevant_articles.append({
-                        'id': article_id,
-                        'title': source_name,
-                        'summary': news_information[:200] + '...' if news_information and len(news_information) > 200 else news_information,
-                        'relevance': f"Matches keywords: {', '.join(matching_keywords)}"
-                    })
+                snippet = article.get('snippet', '')
+                relevant_articles.append({
+                    'id': article.get('id'),
+                    'title': article.get('source_name', ''),
+                    'summary': snippet + '...' if len(snippet) >= 200 else snippet,
+                    'relevance': f"Matches keywords: {', '.join(article.get('matched_keywords', []))}"
+                })
             
             logger.debug(f"Fallback search found {len(relevant_articles)} relevant articles")
             
@@ -383,121 +463,119 @@ class NaturalLanguageUnderstanding:
     
     def _save_analysis_result(self, query: str, analysis: Dict[str, Any]) -> bool:
         """
-        Save analysis results to the database via FastAPI backend.
+        Save analysis results to the database.
+        
+        Written directly rather than through POST /analyze-query, whose rows
+        any client can supply and which are therefore never trusted as labels.
         """
         try:
-            # Create the analysis request
-            analysis_data = {
-                "query": query,
-                "analysis": analysis
-            }
-            
-            # Send the analysis to the backend
-            try:
-                response = requests.post(
-                    f"{BACKEND_URL}/analyze-query", 
-                    json={"query": query},
-                    timeout=5
-                )
-            except requests.exceptions.ConnectionError:
-                logger.error(f"Could not connect to the backend at {BACKEND_URL}. Is the server running?")
-                return False
-            except requests.exceptions.Timeout:
-                logger.error(f"Request to {BACKEND_URL}/analyze-query timed out after 5 seconds")
-                return False
-            except Exception as e:
-                logger.error(f"Unexpected error connecting to backend: {str(e)}")
-                return False
-            
-            if response.status_code == 200:
-                return True
-            else:
-                logger.error(f"Error saving analysis: {response.status_code}")
-                return False
-                
+            return Database().save_analysis_result(query, analysis, "natural_language_understanding")
         except Exception as e:
-            logger.error(f"Error saving analysis to backend: {str(e)}")
+            logger.error(f"Error saving analysis: {str(e)}")
             return False
     
-    def _fetch_previous_analyses(self, module: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def _fetch_previous_analysis(self, module: str, query: str) -> Optional[Dict[str, Any]]:
         """
-        Fetch previous analysis results from the database via FastAPI backend.
+        Fetch the previous analysis of a query from the database via FastAPI backend.
+        The lookup is keyed by a hash of the normalized query rather than a scan of recent rows.
         """
         try:
-            # This would require a new endpoint in the FastAPI backend
-            # For now, we'll return an empty list
-            return []
+            query_hash = Database.content_hash(query)
+            response = self.http.get(
+                f"{BACKEND_URL}/analyze-query",
+                params={"module": module, "query_hash": query_hash},
+                timeout=5
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 404:
+                logger.error(f"Error fetching previous analysis: {response.status_code}")
+            return None
                 
         except Exception as e:
-            logger.error(f"Error fetching previous analyses: {str(e)}")
-            return []
+            logger.error(f"Error fetching previous analysis: {str(e)}")
+            return None
     
-    def _generate_response(self, query: str, analysis: Dict[str, Any], articles: List[Dict[str, Any]]) -> str:
+    def _generate_response(self, query: str, analysis: Dict[str, Any], articles: List[Dict[str, Any]],
+                           conversation_context: str = "") -> str:
         """
         Generate a conversational response based on the query, analysis, and articles.
         Only called when there are matching articles in the database.
         """
         try:
-            # Build conversation history for context
-            conversation_context = ""
-            if self.conversation_history:
-                conversation_context = "Previous conversation:\n"
-                for exchange in self.conversation_history:
-                    conversation_context += f"User: {exchange['query']}\nAssistant: {exchange['response']}\n"
-            
-            # Build article information
-            articles_info = ""
-            if articles:
-                articles_info = "I found these relevant articles that match the user's query:\n"
-                for i, article in enumerate(articles, 1):
-                    articles_info += f"{i}. {article['title']}\n"
-                    articles_info += f"   Summary: {article['summary']}\n"
-                    articles_info += f"   Relevance: {article['relevance']}\n"
-            
-            # Build the prompt for the chatbot response
-            response_prompt = f"""You are a friendly and helpful chatbot assistant named Genesis. Your primary purpose is to provide 
-            information from news articles in your database. You should focus on sharing information ONLY from the articles found
-            and not make up information.
-            
-            {conversation_context}
-            
-            User's current query: {query}
-            
-            Topic of the query: {analysis['topic']}
-            Keywords searched: {', '.join(analysis['keywords'])}
-            
-            {articles_info}
-            
-            Provide a helpful response to the user that only discusses information found in these articles. Use natural, conversational
-            language without explicitly saying "I found these articles" - instead incorporate the information naturally. If there are
-            multiple articles, try to synthesize the information. Always stick to what's found in the articles.
-            """
+            response_prompt = self._build_response_prompt(query, analysis, articles, conversation_context)
             
             # Generate response using Cohere
             response = self.client.chat(
                 message=response_prompt,
                 model="command",
-                temperature=0.7  # Slightly higher temperature for more varied responses
+                temperature=0.7,  # Slightly higher temperature for more varied responses
+                cache=False  # Conversational replies should vary, so skip the LLM cache
             )
             
             return response.text.strip()
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            return "I found some information about that, but I'm having trouble processing it. Could you try asking in a different way?"
+            return RESPONSE_ERROR_MESSAGE
     
-    def _update_conversation_history(self, query: str, response: str):
+    def _stream_response(self, query: str, analysis: Dict[str, Any], articles: List[Dict[str, Any]],
+                         conversation_context: str = "") -> Iterator[str]:
         """
-        Update the conversation history with the latest exchange.
+        Generate the same response as `_generate_response`, yielding text as Cohere emits it.
         """
-        self.conversation_history.append({
-            "query": query,
-            "response": response
-        })
+        streamed = False
+        try:
+            response_prompt = self._build_response_prompt(query, analysis, articles, conversation_context)
+            
+            for event in self.client.chat(
+                message=response_prompt,
+                model="command",
+                temperature=0.7,
+                stream=True
+            ):
+                if getattr(event, "event_type", None) == "text-generation" and event.text:
+                    streamed = True
+                    yield event.text
+                    
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            if not streamed:
+                yield RESPONSE_ERROR_MESSAGE
+    
+    def _build_response_prompt(self, query: str, analysis: Dict[str, Any], articles: List[Dict[str, Any]],
+                               conversation_context: str) -> str:
+        """
+        Build the chatbot prompt from the conversation context, the analysis and the articles.
+        """
+        # Build article information, capped so the prompt doesn't grow with the number of matches
+        articles_info = ""
+        if articles:
+            articles_info = "I found these relevant articles that match the user's query:\n"
+            for i, article in enumerate(articles[:MAX_PROMPT_ARTICLES], 1):
+                articles_info += f"{i}. {article['title']}\n"
+                articles_info += f"   Summary: {truncate_to_tokens(article['summary'], 60)}\n"
+                articles_info += f"   Relevance: {article['relevance']}\n"
+        
+        # Build the prompt for the chatbot response
+        return f"""You are a friendly and helpful chatbot assistant named Genesis. Your primary purpose is to provide 
+        information from news articles in your database. You should focus on sharing information ONLY from the articles found
+        and not make up information.
+        
+        {conversation_context}
         
-        # Limit the history length
-        if len(self.conversation_history) > self.max_history_length:
-            self.conversation_history = self.conversation_history[-self.max_history_length:]
+        User's current query: {query}
+        
+        Topic of the query: {analysis['topic']}
+        Keywords searched: {', '.join(analysis['keywords'])}
+        
+        {articles_info}
+        
+        Provide a helpful response to the user that only discusses information found in these articles. Use natural, conversational
+        language without explicitly saying "I found these articles" - instead incorporate the information naturally. If there are
+        multiple articles, try to synthesize the information. Always stick to what's found in the articles.
+        """
     
     def format_output(self, analysis_result: Dict[str, Any]) -> str:
         """
@@ -1,13 +1,14 @@
 import os
 import cohere
 from typing import List, Dict, Any
+from api.llm_cache import CachedLLMClient
 
 class NeutralArticleGenerator:
     """Class to generate neutral articles based on multiple sources"""
     
     def __init__(self):
         """Initialize the neutral article generator with a Cohere client"""
-        self.co = cohere.Client(os.getenv('COHERE_API_KEY'))
+        self.co = CachedLLMClient(cohere.Client(os.getenv('COHERE_API_KEY')), "neutral_article_generator")
         if not os.getenv('COHERE_API_KEY'):
             print("WARNING: COHERE_API_KEY not found in environment variables")
     
@@ -6,6 +6,7 @@ from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 import os
 from api.database import Database
+from api.llm_cache import CachedLLMClient
 
 # Configure logging
 # logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,7 +20,7 @@ class NeutralityCheck:
         """
         Initialize the Neutrality Check module with Cohere API key.
         """
-        self.client = cohere.Client(os.getenv('COHERE_API_KEY'))
+        self.client = CachedLLMClient(cohere.Client(os.getenv('COHERE_API_KEY')), "neutrality_check")
         self.db = Database()
 
     def fetch_article_for_check(self, article_id: Optional[str] = None) -> Dict[str, Any]:
@@ -37,6 +38,7 @@ class NeutralityCheck:
             article = self.db.fetch_article_by_id(article_id)
             if article:
                 return {
+                    "article_id": article.get('id'),
                     "customized_article": {
                         "title": article.get('title', ''),
                         "content": article.get('content', article.get('body', ''))
@@ -47,6 +49,7 @@ class NeutralityCheck:
         articles = self.db.fetch_articles(limit=1)
         if articles and len(articles) > 0:
             return {
+                "article_id": articles[0].get('id'),
                 "customized_article": {
                     "title": articles[0].get('title', ''),
                     "content": articles[0].get('content', articles[0].get('body', ''))
@@ -143,7 +146,13 @@ class NeutralityCheck:
             }
             
             # Save the neutrality check result to the database
-            self.db.save_analysis_result(title, result, "neutrality_check")
+            self.db.save_analysis_result(
+                title,
+                result,
+                "neutrality_check",
+                article_id=article_data.get('article_id'),
+                content_hash=self.db.content_hash(title, content)
+            )
             
             return result
             
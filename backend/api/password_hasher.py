@@ -0,0 +1,114 @@
+import os
+import bcrypt
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already waiting to run."""
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a dedicated, size-capped thread pool.
+
+    bcrypt releases the GIL while it works, so a small pool lets a few hashes run
+    in parallel without blocking the event loop or the rest of the server. The
+    number of waiting hashes is capped; beyond that `PasswordHasherBusy` is raised
+    so a login burst is rejected quickly instead of queuing without bound.
+
+    `submit_hash` and `submit_check` return futures, so async callers can await
+    them with `asyncio.wrap_future` without tying up a thread while they wait.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 rounds: Optional[int] = None):
+        """
+        Args:
+            max_workers (Optional[int]): Number of hashing threads
+            max_queue (Optional[int]): Maximum number of hashes waiting for a thread
+            rounds (Optional[int]): bcrypt work factor used for new hashes
+        """
+        self.max_workers = max_workers or int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+        self.rounds = rounds or int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self.stats = {
+            "completed": 0,
+            "rejected": 0,
+            "max_pending": 0
+        }
+
+    def submit_hash(self, password: str) -> Future:
+        """Queue hashing a password with the configured work factor."""
+        return self._run(self._hashpw, password)
+
+    def submit_check(self, password: str, hashed_password: str) -> Future:
+        """Queue checking a password against a stored bcrypt hash."""
+        return self._run(self._checkpw, password, hashed_password)
+
+    def hash_password(self, password: str) -> str:
+        """Hash a password, blocking the calling thread until it is done."""
+        return self.submit_hash(password).result()
+
+    def check_password(self, password: str, hashed_password: str) -> bool:
+        """Check a password, blocking the calling thread until it is done."""
+        return self.submit_check(password, hashed_password).result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return pool size, current queue depth and counters."""
+        with self._lock:
+            return dict(
+                self.stats,
+                workers=self.max_workers,
+                rounds=self.rounds,
+                queued=self._pending - self._active,
+                active=self._active
+            )
+
+    def shutdown(self):
+        """Stop accepting work and wait for running hashes to finish."""
+        self._executor.shutdown(wait=True)
+
+    def _run(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_queue + self.max_workers:
+                self.stats["rejected"] += 1
+                raise PasswordHasherBusy("Too many password operations in progress")
+            self._pending += 1
+            self.stats["max_pending"] = max(self.stats["max_pending"], self._pending)
+
+        try:
+            future = self._executor.submit(self._track, fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _track(self, fn, *args):
+        with self._lock:
+            self._active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self.stats["completed"] += 1
+
+    def _hashpw(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    def _checkpw(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
@@ -0,0 +1,138 @@
+import os
+import gzip
+from typing import Any, Awaitable, Callable, Optional
+import anyio
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without the brotli package
+    brotli = None
+
+# Content types worth compressing; event streams are always sent as-is
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain")
+
+
+class FastJSONResponse(ORJSONResponse):
+    """Serializes response bodies with orjson.
+
+    Non-string dict keys (e.g. article ids) are converted to strings the same
+    way the standard library does, instead of raising.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """Streams a body, then awaits `release` however the response ended.
+
+    A background task would be skipped when the body iterator raises, so the
+    release runs in a `finally` around the whole response instead: after the
+    last chunk, on an error, and when the client disconnects.
+    """
+
+    def __init__(self, content: Any, release: Callable[[], Awaitable[Any]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.release()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best encoding the client accepts: brotli if available, then gzip."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(token.strip().lower())
+
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_body(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Compress a complete response body with `encoding` ("br" or "gzip")."""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """Compresses complete JSON and text responses above a size threshold.
+
+    The encoding is negotiated from Accept-Encoding. Small bodies, responses
+    that already set Content-Encoding, and streamed responses (more than one
+    body message) are passed through untouched, so token streams are never
+    held back waiting for a compressor.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None, gzip_level: int = 6, brotli_quality: int = 4):
+        """
+        Args:
+            app: The ASGI application to wrap
+            minimum_size (Optional[int]): Bodies smaller than this many bytes are sent uncompressed
+            gzip_level (int): gzip compression level
+            brotli_quality (int): brotli quality; low values keep encode time down
+        """
+        self.app = app
+        self.minimum_size = minimum_size or int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows whether to compress
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start)
+            content_type = headers.get("content-type", "")
+
+            if (message.get("more_body", False)
+                    or "content-encoding" in headers
+                    or len(body) < self.minimum_size
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress_body(body, encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
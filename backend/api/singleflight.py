@@ -0,0 +1,67 @@
+import re
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running await the same future and receive the same result (or
+    exception). Waiting callers are suspended on the event loop rather than
+    blocked in a thread, so a burst of identical queries costs one pipeline
+    run and no extra threads. Once the call finishes the key is forgotten, so
+    later calls run again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {
+            "executed": 0,
+            "coalesced": 0
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` for `key`, or await the call already in flight.
+
+        Args:
+            key (Hashable): Identifies calls that may share a result
+            fn (Callable[[], Awaitable[Any]]): Coroutine function to run when no call is in flight
+
+        Returns:
+            Any: The result of `fn`, shared by every caller for `key`
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.stats["coalesced"] += 1
+            # Shielded so one waiter giving up doesn't cancel the call for the others
+            return await asyncio.shield(call)
+
+        call = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even when nobody else was waiting for it
+        call.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = call
+        self.stats["executed"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return counters together with the number of calls in flight."""
+        return dict(self.stats, in_flight=len(self._calls))
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a user query so trivially different phrasings share a key."""
+    query = re.sub(r'\s+', ' ', query.lower()).strip()
+    return query.strip('.,?!:;()[]{}"\' ')
@@ -0,0 +1,109 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.admission import (AdmissionController, AdmissionRejected, TIER_FULL, TIER_NO_NEUTRAL_ARTICLE,
+                           TIER_NO_SUMMARIES, TIER_CACHED_ONLY)
+
+
+async def hold(controller, release, tiers=None):
+    async with controller.admit() as tier:
+        if tiers is not None:
+            tiers.append(tier)
+        await release.wait()
+
+
+def test_requests_beyond_the_limit_wait_for_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=2, max_queue=4, queue_timeout=5)
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(controller, release)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        busy = controller.get_stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return busy, controller.get_stats()
+
+    busy, idle = asyncio.run(scenario())
+    assert busy["in_flight"] == 2
+    assert busy["waiting"] == 1
+    assert idle["in_flight"] == 0
+    assert idle["waiting"] == 0
+    assert idle["admitted"] == 3
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(controller, release)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit():
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1
+    assert stats["admitted"] == 2
+
+
+def test_waiting_too_long_is_rejected_without_leaking_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.02)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit():
+                pass
+        release.set()
+        await holder
+        # The slot is free again once the holder is done
+        async with controller.admit():
+            pass
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 1
+    assert stats["admitted"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_slot_is_released_when_the_pipeline_raises():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+        with pytest.raises(RuntimeError):
+            async with controller.admit():
+                raise RuntimeError("pipeline failed")
+        async with controller.admit():
+            pass
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_tier_degrades_as_the_queue_fills():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+        release = asyncio.Event()
+        tiers = []
+        tasks = []
+        for _ in range(5):
+            tasks.append(asyncio.ensure_future(hold(controller, release, tiers)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return tiers
+
+    # Each request gets the tier for the queue it found when it arrived
+    assert asyncio.run(scenario()) == [TIER_FULL, TIER_FULL, TIER_NO_NEUTRAL_ARTICLE, TIER_NO_SUMMARIES, TIER_CACHED_ONLY]
@@ -0,0 +1,133 @@
+import os
+import sys
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.analysis_buffer import AnalysisWriteBuffer
+
+
+class FlakyInserter:
+    """Records inserted batches, failing the first `failures` calls."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("insert failed")
+        self.batches.append(list(batch))
+
+
+def make_buffer(inserter, tmp_path, **kwargs):
+    options = dict(
+        max_pending=100,
+        batch_size=100,
+        flush_interval=60,
+        overflow="drop",
+        spill_path=str(tmp_path / "spill.jsonl"),
+        max_retries=2,
+        retry_backoff=0
+    )
+    options.update(kwargs)
+    return AnalysisWriteBuffer(inserter, **options)
+
+
+def test_flush_writes_pending_rows_in_batches(tmp_path):
+    inserter = FlakyInserter()
+    buffer = make_buffer(inserter, tmp_path, batch_size=2, max_pending=10)
+    # Keep the background thread from flushing while rows are added
+    with buffer._flush_lock:
+        for i in range(5):
+            assert buffer.add({"id": i})
+
+    buffer.flush()
+
+    assert [len(batch) for batch in inserter.batches] == [2, 2, 1]
+    assert [row["id"] for batch in inserter.batches for row in batch] == list(range(5))
+    stats = buffer.get_stats()
+    assert stats["enqueued"] == 5
+    assert stats["flushed"] == 5
+    assert stats["pending"] == 0
+    buffer.close()
+
+
+def test_full_queue_drops_new_rows(tmp_path):
+    inserter = FlakyInserter()
+    buffer = make_buffer(inserter, tmp_path, max_pending=2)
+
+    assert buffer.add({"id": 1})
+    assert buffer.add({"id": 2})
+    assert not buffer.add({"id": 3})
+
+    buffer.flush()
+    stats = buffer.get_stats()
+    assert stats["flushed"] == 2
+    assert stats["dropped"] == 1
+    buffer.close()
+
+
+def test_failed_insert_is_retried(tmp_path):
+    inserter = FlakyInserter(failures=2)
+    buffer = make_buffer(inserter, tmp_path)
+    buffer.add({"id": 1})
+
+    assert buffer.flush() == 1
+
+    stats = buffer.get_stats()
+    assert stats["retries"] == 2
+    assert stats["flushed"] == 1
+    assert stats["dropped"] == 0
+    buffer.close()
+
+
+def test_rows_that_keep_failing_are_spilled_and_replayed(tmp_path):
+    inserter = FlakyInserter(failures=1000)
+    buffer = make_buffer(inserter, tmp_path, overflow="spill")
+    buffer.add({"id": 1})
+    buffer.add({"id": 2})
+
+    # Every attempt fails, so both rows go to the spill file and stay there
+    assert buffer.flush() == 0
+    assert buffer.get_stats()["spilled"] == 2
+    assert os.path.exists(buffer.spill_path)
+
+    inserter.failures = 0
+    assert buffer.flush() == 2
+    stats = buffer.get_stats()
+    assert stats["replayed"] == 2
+    assert stats["flushed"] == 0
+    assert stats["spilled"] == 2
+    assert not os.path.exists(buffer.spill_path)
+    assert [row["id"] for row in inserter.batches[0]] == [1, 2]
+    buffer.close()
+
+
+def test_spilled_rows_that_fail_again_are_kept_without_counting_twice(tmp_path):
+    inserter = FlakyInserter(failures=1000)
+    buffer = make_buffer(inserter, tmp_path, overflow="spill")
+    buffer.add({"id": 1})
+
+    buffer.flush()
+    buffer.flush()
+
+    stats = buffer.get_stats()
+    assert stats["spilled"] == 1
+    assert stats["replayed"] == 0
+    with open(buffer.spill_path) as f:
+        assert len(f.readlines()) == 1
+    inserter.failures = 0
+    buffer.close()
+
+
+def test_rows_added_after_close_are_written_immediately(tmp_path):
+    inserter = FlakyInserter()
+    buffer = make_buffer(inserter, tmp_path)
+    buffer.close()
+
+    assert buffer.add({"id": 1})
+
+    assert inserter.batches == [[{"id": 1}]]
+    assert buffer.get_stats()["flushed"] == 1
@@ -0,0 +1,152 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.article_snapshot import ArticleSnapshot
+from api.article_text_store import ArticleTextStore
+
+
+class FakeQuery:
+    """Just enough of the Supabase query builder for ArticleSnapshot."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.columns = None
+        self.count = None
+
+    def select(self, columns):
+        self.columns = [column.strip() for column in columns.split(",")]
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = [row for row in sorted(self.rows, key=lambda row: row["id"]) if all(f(row) for f in self.filters)]
+        data = [{column: row[column] for column in self.columns} for row in rows[:self.count]]
+        return type("Response", (), {"data": data})
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return FakeQuery(self.rows)
+
+
+def article(article_id, title, body):
+    return {
+        "id": article_id,
+        "article_titles": title,
+        "source_name": "Example News",
+        "source_link": f"https://example.com/{article_id}",
+        "news_information": body
+    }
+
+
+@pytest.fixture
+def client():
+    return FakeClient([
+        article(1, "Solar farms expand", "Solar power capacity grew across the region."),
+        article(2, "Wind energy record", "Offshore wind turbines set a new output record."),
+        article(3, "Markets rally", "Stocks rose as renewable energy shares climbed."),
+        article(4, "Solar panel prices fall", "Cheaper panels make solar power more common."),
+        article(5, "Election coverage", "Voters head to the polls.")
+    ])
+
+
+@pytest.fixture
+def snapshot(client, tmp_path):
+    snapshot = ArticleSnapshot(lambda: client, page_size=2, text_store=ArticleTextStore(str(tmp_path)))
+    snapshot.refresh()
+    return snapshot
+
+
+def ids(page):
+    return [a["id"] for a in page["articles"]]
+
+
+def test_refresh_loads_every_page_and_then_only_new_rows(client, snapshot):
+    assert len(snapshot) == 5
+    assert snapshot.watermark == 5
+
+    client.rows.append(article(6, "Late story", "Added after the first load."))
+    assert snapshot.refresh() == 1
+    assert snapshot.get(6)["article_titles"] == "Late story"
+
+
+def test_cursor_pages_cover_every_article_newest_first(snapshot):
+    first = snapshot.search(limit=2)
+    second = snapshot.search(limit=2, cursor=first["next_cursor"])
+    third = snapshot.search(limit=2, cursor=second["next_cursor"])
+
+    assert ids(first) == [5, 4]
+    assert ids(second) == [3, 2]
+    assert ids(third) == [1]
+    assert third["next_cursor"] is None
+
+
+def test_cursor_is_stable_while_new_articles_arrive(client, snapshot):
+    first = snapshot.search(limit=2)
+    client.rows.append(article(6, "Late story", "Added between pages."))
+    snapshot.refresh()
+
+    assert ids(snapshot.search(limit=2, cursor=first["next_cursor"])) == [3, 2]
+
+
+def test_query_matches_words_in_title_or_body(snapshot):
+    assert ids(snapshot.search("solar")) == [4, 1]
+    assert ids(snapshot.search("renewable energy")) == [3]
+    # Every word must appear, in order
+    assert ids(snapshot.search("energy renewable")) == []
+
+    first = snapshot.search("solar", limit=1)
+    assert ids(snapshot.search("solar", limit=1, cursor=first["next_cursor"])) == [1]
+
+
+def test_fields_are_projected(snapshot):
+    page = snapshot.search("election", fields=["id", "snippet"], snippet_chars=6)
+    assert page["articles"] == [{"id": 5, "snippet": "Voters"}]
+
+    with pytest.raises(ValueError):
+        snapshot.search(fields=["password"])
+    with pytest.raises(ValueError):
+        snapshot.search(cursor="not a cursor")
+
+
+def test_match_keywords_ranks_articles_matching_more_keywords_first(snapshot):
+    matches = snapshot.match_keywords(["solar", "power"])
+    assert [m["id"] for m in matches] == [4, 1]
+    assert matches[0]["matched_keywords"] == ["solar", "power"]
+
+
+def test_reconcile_drops_articles_deleted_upstream(client, snapshot, tmp_path):
+    client.rows[:] = [row for row in client.rows if row["id"] != 4]
+
+    assert snapshot.reconcile() == 1
+
+    assert len(snapshot) == 4
+    assert snapshot.get(4) is None
+    assert snapshot.text(4) is None
+    assert ids(snapshot.search("solar")) == [1]
+    assert ids(snapshot.search()) == [5, 3, 2, 1]
+    assert [a["id"] for a in snapshot.search_titles("solar")] == [1]
+    assert ArticleTextStore(str(tmp_path)).text(4) is None
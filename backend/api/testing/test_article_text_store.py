@@ -0,0 +1,83 @@
+import os
+import sys
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.article_text_store import ArticleTextStore
+
+
+def test_bodies_round_trip_including_empty_and_non_ascii(tmp_path):
+    store = ArticleTextStore(str(tmp_path))
+    assert store.append([(1, "First body"), (2, ""), (3, "Café résumé naïve"), (4, None)]) == 4
+
+    assert store.text(1) == "First body"
+    assert store.text(2) == ""
+    assert store.text(3) == "Café résumé naïve"
+    assert store.text(4) == ""
+    assert store.text(99) is None
+    assert store.text(3, max_chars=4) == "Café"
+    assert len(store) == 4 and 1 in store
+
+
+def test_unchanged_bodies_are_not_written_again(tmp_path):
+    store = ArticleTextStore(str(tmp_path))
+    store.append([(1, "Body")])
+    blob_bytes = store.get_stats()["blob_bytes"]
+
+    assert store.append([(1, "Body")]) == 0
+    assert store.get_stats()["blob_bytes"] == blob_bytes
+
+
+def test_edited_body_replaces_the_stored_one(tmp_path):
+    store = ArticleTextStore(str(tmp_path))
+    store.append([(1, "Original body")])
+
+    assert store.append([(1, "Edited body")]) == 1
+
+    assert store.text(1) == "Edited body"
+    assert store.get_stats()["stale_bytes"] == len("Original body")
+
+
+def test_another_instance_sees_appends_and_discards(tmp_path):
+    writer = ArticleTextStore(str(tmp_path))
+    reader = ArticleTextStore(str(tmp_path))
+    writer.append([(1, "Shared body"), (2, "Doomed body")])
+
+    assert reader.text(1) == "Shared body"
+
+    assert writer.discard([2, 3]) == 1
+    assert writer.text(2) is None
+    assert ArticleTextStore(str(tmp_path)).text(2) is None
+
+
+def test_compact_reclaims_superseded_bytes(tmp_path):
+    store = ArticleTextStore(str(tmp_path), compact_ratio=1.0)
+    other = ArticleTextStore(str(tmp_path), compact_ratio=1.0)
+    store.append([(1, "a" * 100), (2, "b" * 10)])
+    store.append([(1, "c" * 20)])
+    store.discard([2])
+
+    assert store.compact() == 110
+
+    stats = store.get_stats()
+    assert stats["generation"] == 1
+    assert stats["stale_bytes"] == 0
+    assert stats["blob_bytes"] == 20
+    assert store.text(1) == "c" * 20
+    # An instance opened on the old generation follows the switch
+    assert other.text(1) == "c" * 20
+    assert other.text(2) is None
+    assert sorted(os.listdir(tmp_path)) == ["articles.1.blob", "articles.1.idx", "articles.current", "articles.lock"]
+
+
+def test_opening_a_mostly_stale_store_compacts_it(tmp_path):
+    store = ArticleTextStore(str(tmp_path), compact_ratio=0.5)
+    store.append([(1, "x" * 100)])
+    store.append([(1, "y" * 10)])
+    store.close()
+
+    reopened = ArticleTextStore(str(tmp_path), compact_ratio=0.5)
+
+    assert reopened.get_stats()["stale_bytes"] == 0
+    assert reopened.text(1) == "y" * 10
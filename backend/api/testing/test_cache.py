@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.cache import TTLCache, SQLiteCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_ttl_cache_entries_expire():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_round_trips_json_values(tmp_path):
+    cache = SQLiteCache("test", path=str(tmp_path / "cache.sqlite3"))
+    cache.set("key", {"topic": "environment", "keywords": ["climate"]})
+
+    assert cache.get("key") == {"topic": "environment", "keywords": ["climate"]}
+    cache.delete("key")
+    assert cache.get("key") is None
+
+
+def test_sqlite_cache_is_shared_between_instances_but_not_namespaces(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SQLiteCache("a", path=path)
+    writer.set("key", 1)
+
+    # A second instance stands in for another worker process
+    assert SQLiteCache("a", path=path).get("key") == 1
+    assert SQLiteCache("b", path=path).get("key") is None
+
+
+def test_sqlite_cache_entries_expire(tmp_path):
+    cache = SQLiteCache("test", path=str(tmp_path / "cache.sqlite3"))
+    cache.set("key", 1, ttl=-1)
+    assert cache.get("key") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_sqlite_cache_evicts_least_recently_used_beyond_max_entries(tmp_path):
+    cache = SQLiteCache("test", max_entries=2, path=str(tmp_path / "cache.sqlite3"))
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", 3)
+
+    cache.evict()
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_sqlite_cache_update_applies_concurrent_updates_one_after_another(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    caches = [SQLiteCache("test", path=path) for _ in range(4)]
+
+    def append_items(cache, worker):
+        for i in range(10):
+            cache.update("items", lambda items: (items or []) + [f"{worker}:{i}"])
+
+    threads = [threading.Thread(target=append_items, args=(cache, n)) for n, cache in enumerate(caches)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(caches[0].get("items")) == 40
+
+
+def test_sqlite_cache_update_rolls_back_when_fn_raises(tmp_path):
+    cache = SQLiteCache("test", path=str(tmp_path / "cache.sqlite3"))
+    cache.set("key", 1)
+
+    def fail(value):
+        raise ValueError("bad value")
+
+    with pytest.raises(ValueError):
+        cache.update("key", fail)
+    assert cache.get("key") == 1
+    assert cache.update("key", lambda value: value + 1) == 2
+
+
+def test_sqlite_cache_update_keeps_namespace_under_max_bytes(tmp_path):
+    cache = SQLiteCache("test", path=str(tmp_path / "cache.sqlite3"), max_bytes=100)
+    for i in range(10):
+        cache.update(f"key{i}", lambda value: "x" * 30)
+        time.sleep(0.001)
+
+    stats = cache.get_stats()
+    assert stats["bytes"] <= 100
+    assert stats["evictions"] > 0
+    # The newest entry survives
+    assert cache.get("key9") == "x" * 30
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.conversation_store import ConversationStore
+
+
+def join_summary(summary, exchange):
+    return (summary + " | " if summary else "") + exchange["query"]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def persistent(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    return request.param == "sqlite"
+
+
+def test_sessions_keep_their_last_exchanges_and_summarize_older_ones(persistent):
+    store = ConversationStore(max_exchanges=2, persistent=persistent, summarizer=join_summary)
+    for i in range(4):
+        store.append("alice", f"q{i}", f"r{i}")
+    store.append("bob", "hello", "hi")
+
+    summary, recent = store.context("alice")
+    assert summary == "q0 | q1"
+    assert [exchange["query"] for exchange in recent] == ["q2", "q3"]
+    assert store.history("bob") == [{"query": "hello", "response": "hi"}]
+    assert store.context("carol") == ("", [])
+
+
+def test_clear_forgets_a_session(persistent):
+    store = ConversationStore(max_exchanges=2, persistent=persistent)
+    store.append("alice", "q", "r")
+    store.clear("alice")
+    assert store.history("alice") == []
+
+
+def test_least_recently_used_session_is_evicted_beyond_max_sessions():
+    store = ConversationStore(max_exchanges=2, max_sessions=2, persistent=False)
+    store.append("alice", "q", "r")
+    store.append("bob", "q", "r")
+    store.history("alice")
+    store.append("carol", "q", "r")
+
+    assert store.history("bob") == []
+    assert store.history("alice") != []
+    assert store.get_stats()["evicted"] == 1
+
+
+def test_sessions_are_evicted_to_stay_under_max_bytes():
+    store = ConversationStore(max_exchanges=5, max_bytes=50, persistent=False)
+    for session in ("alice", "bob", "carol"):
+        store.append(session, "q" * 10, "r" * 10)
+
+    stats = store.get_stats()
+    assert stats["bytes"] <= 50
+    assert stats["sessions"] == 2
+    assert store.history("alice") == []
+
+
+def test_idle_sessions_expire():
+    store = ConversationStore(max_exchanges=2, idle_ttl=0.01, persistent=False)
+    store.append("alice", "q", "r")
+    time.sleep(0.02)
+
+    assert store.history("alice") == []
+    assert store.get_stats()["expired"] == 1
+
+
+def test_concurrent_appends_to_a_shared_session_are_all_kept(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    # One store per thread stands in for one per worker process
+    stores = [ConversationStore(max_exchanges=100, persistent=True) for _ in range(4)]
+
+    def talk(store, worker):
+        for i in range(10):
+            store.append("alice", f"{worker}:{i}", "r")
+
+    threads = [threading.Thread(target=talk, args=(store, n)) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stores[0].history("alice")) == 40
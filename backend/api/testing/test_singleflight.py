@@ -0,0 +1,86 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.singleflight import SingleFlight, normalize_query
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        runs = 0
+
+        async def pipeline():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return {"response": "shared"}
+
+        results = await asyncio.gather(*(flight.do("query", pipeline) for _ in range(50)))
+        return flight, runs, results
+
+    flight, runs, results = asyncio.run(scenario())
+    assert runs == 1
+    assert all(result is results[0] for result in results)
+    assert flight.get_stats() == {"executed": 1, "coalesced": 49, "in_flight": 0}
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def pipeline():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("pipeline failed")
+
+        return await asyncio.gather(*(flight.do("query", pipeline) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_follower_does_not_cancel_the_call():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def pipeline():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("query", pipeline))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("query", pipeline))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader, follower
+
+    result, follower = asyncio.run(scenario())
+    assert result == "done"
+    assert follower.cancelled()
+
+
+def test_key_is_forgotten_once_the_call_finishes():
+    async def scenario():
+        flight = SingleFlight()
+        runs = 0
+
+        async def pipeline():
+            nonlocal runs
+            runs += 1
+            return runs
+
+        first = await flight.do("query", pipeline)
+        second = await flight.do("query", pipeline)
+        return first, second
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+@pytest.mark.parametrize("query", ["What is AI?", "  what   is ai ", "WHAT IS AI!"])
+def test_normalize_query_ignores_case_spacing_and_punctuation(query):
+    assert normalize_query(query) == "what is ai"
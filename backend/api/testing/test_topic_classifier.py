@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Add the backend directory to the path so the api package imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.topic_classifier import TopicClassifier
+
+TOPICS = ("renewable energy", "business impact", "environment", "artificial intelligence", "general")
+
+
+def test_seed_lexicon_answers_clear_queries():
+    classifier = TopicClassifier(TOPICS)
+
+    assert classifier.predict("latest news on machine learning chatbots")[0] == "artificial intelligence"
+    assert classifier.predict("new solar and wind farm projects")[0] == "renewable energy"
+    assert classifier.predict("climate change and ocean pollution")[0] == "environment"
+
+
+def test_confidence_is_a_probability():
+    classifier = TopicClassifier(TOPICS)
+
+    _, clear = classifier.predict("solar battery clean energy")
+    _, vague = classifier.predict("what happened today")
+
+    assert 0.0 < vague < clear <= 1.0
+
+
+def test_learning_from_labelled_queries_changes_predictions():
+    classifier = TopicClassifier(TOPICS, lexicon={})
+    for _ in range(5):
+        classifier.learn("interest rates and the housing market", "business impact")
+        classifier.learn("coral reefs bleaching", "environment")
+
+    topic, confidence = classifier.predict("housing market outlook")
+    assert topic == "business impact"
+    assert confidence > 0.8
+    assert classifier.get_stats()["examples"]["business impact"] == 5
+
+
+def test_unknown_topics_and_empty_text_are_ignored():
+    classifier = TopicClassifier(TOPICS, lexicon={})
+    classifier.learn("something", "sports")
+    classifier.learn("", "environment")
+
+    assert classifier.get_stats()["trained"] == 0
+    # With nothing learned the last topic is returned with no confidence
+    assert classifier.predict("anything") == ("general", 0.0)
+
+
+def test_features_are_the_same_in_every_instance():
+    first = TopicClassifier(TOPICS, n_features=1024)
+    second = TopicClassifier(TOPICS, n_features=1024)
+    assert first._features("solar power grid") == second._features("solar power grid")
@@ -0,0 +1,111 @@
+import os
+import re
+import math
+import zlib
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Seed terms for each topic, so the classifier is useful before it has seen any stored analyses
+DEFAULT_LEXICON = {
+    "artificial intelligence": ["artificial intelligence", "ai", "machine learning", "neural network",
+                                "chatbot", "chatgpt", "llm", "robot", "automation", "algorithm", "deep learning"],
+    "renewable energy": ["renewable energy", "solar", "wind power", "wind farm", "battery", "electric vehicle",
+                         "hydrogen", "geothermal", "clean energy", "power grid", "energy"],
+    "business impact": ["business", "economy", "economic", "market", "stock", "company", "inflation",
+                        "trade", "tariff", "earnings", "jobs", "investment"],
+    "environment": ["environment", "climate", "climate change", "emissions", "pollution", "carbon",
+                    "wildlife", "deforestation", "global warming", "biodiversity", "ocean"]
+}
+
+
+class TopicClassifier:
+    """Multinomial naive Bayes topic classifier over hashed word features.
+
+    Text is reduced to hashed unigrams and bigrams, so the model is a set of
+    sparse counts with no vocabulary to maintain. It is seeded from a keyword
+    lexicon and then learns from labelled queries: stored analyses at start
+    up and every answer the LLM gives afterwards. `predict` returns the
+    posterior probability of the best topic, which callers compare against a
+    threshold to decide whether to ask the LLM instead.
+    """
+
+    def __init__(self, topics: Iterable[str], lexicon: Optional[Dict[str, List[str]]] = None,
+                 n_features: Optional[int] = None, alpha: float = 1.0, lexicon_weight: int = 3):
+        """
+        Args:
+            topics (Iterable[str]): The labels the classifier can predict
+            lexicon (Optional[Dict[str, List[str]]]): Seed terms per topic
+            n_features (Optional[int]): Size of the hashed feature space
+            alpha (float): Additive smoothing for unseen features
+            lexicon_weight (int): How many training examples each seed term counts as
+        """
+        self.topics = list(topics)
+        self.n_features = n_features or int(os.getenv("TOPIC_CLASSIFIER_FEATURES", str(2 ** 18)))
+        self.alpha = alpha
+
+        self._lock = threading.Lock()
+        self._feature_counts = {topic: defaultdict(int) for topic in self.topics}
+        self._feature_totals = {topic: 0 for topic in self.topics}
+        self._doc_counts = {topic: 0 for topic in self.topics}
+        self.stats = {
+            "trained": 0,
+            "predictions": 0
+        }
+
+        for topic, terms in (DEFAULT_LEXICON if lexicon is None else lexicon).items():
+            if topic in self._doc_counts:
+                for term in terms:
+                    self.learn(term, topic, weight=lexicon_weight)
+
+    def learn(self, text: str, topic: str, weight: int = 1):
+        """Add one labelled example; unknown topics are ignored."""
+        if topic not in self._doc_counts:
+            return
+        features = self._features(text)
+        if not features:
+            return
+        with self._lock:
+            counts = self._feature_counts[topic]
+            for feature in features:
+                counts[feature] += weight
+            self._feature_totals[topic] += len(features) * weight
+            self._doc_counts[topic] += weight
+            self.stats["trained"] += 1
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return the most likely topic and its posterior probability."""
+        features = self._features(text)
+        with self._lock:
+            self.stats["predictions"] += 1
+            total_docs = sum(self._doc_counts.values())
+            if not features or total_docs == 0:
+                return self.topics[-1], 0.0
+
+            scores = {}
+            for topic in self.topics:
+                # Add-one prior so topics without examples can still be scored
+                log_prob = math.log((self._doc_counts[topic] + 1) / (total_docs + len(self.topics)))
+                counts = self._feature_counts[topic]
+                denominator = self._feature_totals[topic] + self.alpha * self.n_features
+                for feature in features:
+                    log_prob += math.log((counts.get(feature, 0) + self.alpha) / denominator)
+                scores[topic] = log_prob
+
+        best = max(scores, key=scores.get)
+        # Softmax over the log scores, shifted by the best one to avoid underflow
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / normalizer
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return training and prediction counters with examples per topic."""
+        with self._lock:
+            return dict(self.stats, examples=dict(self._doc_counts))
+
+    def _features(self, text: str) -> List[int]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        # crc32 rather than hash() so features are the same in every process
+        return [zlib.crc32(gram.encode("utf-8")) % self.n_features for gram in grams]
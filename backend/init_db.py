@@ -11,6 +11,42 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Schema changes for deployments created before the columns existed. Every
+# statement is idempotent, so this runs safely on new and existing databases.
+MIGRATIONS = [
+    "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS article_id text",
+    "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS content_hash text",
+    "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS module text",
+    "CREATE INDEX IF NOT EXISTS analysis_results_module_article_id_idx "
+    "ON analysis_results (module, article_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS analysis_results_module_content_hash_idx "
+    "ON analysis_results (module, content_hash, created_at)",
+    # Auth.save_user_query upserts on (user_id, query); keep the newest copy of
+    # any duplicate so the unique index can be built
+    "DELETE FROM search_history a USING search_history b "
+    "WHERE a.user_id = b.user_id AND a.query = b.query AND a.id < b.id",
+    "CREATE UNIQUE INDEX IF NOT EXISTS search_history_user_id_query_key "
+    "ON search_history (user_id, query)",
+    # Keyset pagination in Auth.get_user_queries walks this index
+    "CREATE INDEX IF NOT EXISTS search_history_user_id_timestamp_id_idx "
+    "ON search_history (user_id, timestamp DESC, id DESC)",
+]
+
+def migrate_database(supabase):
+    """
+    Apply MIGRATIONS through the `exec_sql` database function.
+    If the function isn't installed, the statements are logged so they can be
+    run from the Supabase SQL editor instead.
+    """
+    for statement in MIGRATIONS:
+        try:
+            supabase.rpc("exec_sql", {"query": statement}).execute()
+        except Exception as e:
+            logger.error(f"Error applying migration: {str(e)}")
+            logger.error("Run these statements in the Supabase SQL editor:\n" + ";\n".join(MIGRATIONS) + ";")
+            return False
+    return True
+
 def initialize_database():
     """
     Initialize the Supabase database with the required tables.
@@ -81,9 +117,54 @@ def initialize_database():
             },
             "query": {
                 "type": "text",
-                "notNull": True
+                "notNull": True,
+                # Auth.save_user_query upserts against this constraint
+                "unique": ["user_id", "query"]
             },
             "timestamp": {
+                "type": "timestamptz",
+                "notNull": True,
+                "default": {
+                    "type": "now"
+                },
+                # Keyset pagination in Auth.get_user_queries walks this index
+                "index": ["user_id", "timestamp", "id"]
+            }
+        })
+        
+        # Create analysis_results table
+        logger.info("Creating 'analysis_results' table...")
+        supabase.table("analysis_results").create({
+            "id": {
+                "type": "int8",
+                "primaryKey": True,
+                "identity": {
+                    "generated_by_default": True
+                }
+            },
+            "query": {
+                "type": "text",
+                "notNull": True
+            },
+            "result": {
+                "type": "jsonb",
+                "notNull": True
+            },
+            "module": {
+                "type": "text",
+                "notNull": True
+            },
+            # Keyed lookups in Database.fetch_analysis filter on
+            # (module, article_id) or (module, content_hash)
+            "article_id": {
+                "type": "text",
+                "index": ["module", "article_id", "created_at"]
+            },
+            "content_hash": {
+                "type": "text",
+                "index": ["module", "content_hash", "created_at"]
+            },
+            "created_at": {
                 "type": "timestamptz",
                 "notNull": True,
                 "default": {
@@ -92,6 +173,11 @@ def initialize_database():
             }
         })
         
+        # Bring tables created by an earlier version up to date
+        logger.info("Applying schema migrations...")
+        if not migrate_database(supabase):
+            return False
+        
         logger.info("Database initialization completed successfully!")
         return True
         
@@ -1,18 +1,27 @@
 import os
+import sys
 import uvicorn
-from api.neutrality_check import NeutralityCheck
-from api.neutral_article_generator import NeutralArticleGenerator
-from fastapi import FastAPI, HTTPException, Depends, Cookie, Response
+import threading
+from contextlib import asynccontextmanager, AsyncExitStack
+from functools import wraps
+from fastapi import FastAPI, HTTPException, Depends, Cookie, Response, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+import orjson
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from supabase import create_client
-import cohere
 import logging
 import json
 import random
 from typing import List, Dict, Any, Optional
 from api.auth import Auth, UserCreate, UserLogin
+from api.password_hasher import PasswordHasherBusy
+from api.singleflight import SingleFlight, normalize_query
+from api.admission import AdmissionController, AdmissionRejected, TIER_FULL, TIER_NO_NEUTRAL_ARTICLE, TIER_NO_SUMMARIES, TIER_CACHED_ONLY
+from api.cache import create_cache
+from api.llm_cache import get_llm_cache
+from api.article_snapshot import ArticleSnapshot
+from api.responses import FastJSONResponse, CompressionMiddleware, ReleasingStreamingResponse
 import jwt as pyjwt
 from datetime import datetime, timedelta
 
@@ -27,31 +36,126 @@ logging.getLogger("fastapi").setLevel(logging.WARNING)
 # Set general logging to WARNING level
 logging.basicConfig(level=logging.WARNING)
 
-# Load environment variables and setup Supabase and Cohere
+# Load environment variables
 load_dotenv()
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 
-supabase = create_client(supabase_url, supabase_key)
-cohere_client = cohere.Client(COHERE_API_KEY)
-
 # JWT settings
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-for-jwt-tokens")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_MINUTES = 60 * 24 * 7  # 1 week
+# Embed the user's id, name and email in the token so most requests skip the users lookup;
+# the account is still checked to exist every USER_REVOCATION_TTL_SECONDS
+JWT_EMBED_USER_CLAIMS = os.getenv("JWT_EMBED_USER_CLAIMS", "false").lower() == "true"
+
+# SDK clients and API modules are created on first use (or by the warm-up in
+# lifespan), so importing this module stays fast and makes no network calls.
+def create_once(factory):
+    """Cache a zero-argument getter's result, building it exactly once
+    
+    Unlike lru_cache, concurrent first calls (the warm-up thread and early
+    requests) wait on a per-getter lock instead of each building their own
+    client.
+    """
+    lock = threading.Lock()
+    instance = []
+    
+    @wraps(factory)
+    def getter():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    
+    getter.is_created = lambda: bool(instance)
+    return getter
+
+@create_once
+def get_supabase():
+    from supabase import create_client
+    return create_client(supabase_url, supabase_key)
+
+@create_once
+def get_cohere_client():
+    import cohere
+    from api.llm_cache import CachedLLMClient
+    return CachedLLMClient(cohere.Client(COHERE_API_KEY), "backend")
 
-# Import custom API modules
-from api.neutrality_check import NeutralityCheck
-from api.neutral_article_generator import NeutralArticleGenerator
-from api.natural_language_understanding import NaturalLanguageUnderstanding
+@create_once
+def get_auth_manager():
+    return Auth(get_supabase())
 
-# Initialize API clients
-nlu = NaturalLanguageUnderstanding()  # Don't pass cohere_client
-neutral_generator = NeutralArticleGenerator()  # Initialize the neutral article generator
-auth_manager = Auth(supabase)  # Initialize auth manager
+@create_once
+def get_database():
+    from api.database import Database
+    # Share the backend's Supabase client instead of letting Database create its own
+    Database.set_backend_client(get_supabase())
+    return Database()
 
-app = FastAPI()
+@create_once
+def get_neutrality_checker():
+    from api.neutrality_check import NeutralityCheck
+    get_database()
+    return NeutralityCheck()
+
+@create_once
+def get_neutral_generator():
+    from api.neutral_article_generator import NeutralArticleGenerator
+    return NeutralArticleGenerator()
+
+@create_once
+def get_nlu():
+    from api.natural_language_understanding import NaturalLanguageUnderstanding
+    return NaturalLanguageUnderstanding()
+
+@create_once
+def get_article_snapshot():
+    snapshot = ArticleSnapshot(get_supabase)
+    # Started here rather than by the warm-up, so the one instance handed out is always loading
+    snapshot.start()
+    return snapshot
+
+chat_flight = SingleFlight()  # Coalesces identical concurrent chat queries
+chat_admission = AdmissionController()  # Bounds concurrent chat pipelines
+chat_response_cache = create_cache("chat_response", max_entries=256, ttl=float(os.getenv("CHAT_CACHE_TTL_SECONDS", "300")))  # Served under load
+
+# Set once the warm-up has created every client
+clients_ready = threading.Event()
+clients_warmup_error = None
+
+def warm_up_clients():
+    """Create the SDK clients and API modules ahead of the first request"""
+    global clients_warmup_error
+    try:
+        get_supabase()
+        get_cohere_client()
+        get_auth_manager()
+        get_neutrality_checker()
+        get_neutral_generator()
+        get_nlu()
+        # Loads the article snapshot, then keeps it up to date in the background
+        get_article_snapshot()
+        clients_ready.set()
+    except Exception as e:
+        clients_warmup_error = str(e)
+        print(f"Error warming up clients: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the worker starts accepting connections immediately
+    threading.Thread(target=warm_up_clients, name="client-warmup", daemon=True).start()
+    yield
+    if get_article_snapshot.is_created():
+        get_article_snapshot().stop()
+    flush_pending_writes()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Chat responses carry every article body, so large ones are sent gzip/brotli compressed
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -61,9 +165,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def flush_pending_writes():
+    # Write out any analysis results still sitting in the write-behind buffer
+    if "api.database" in sys.modules:
+        sys.modules["api.database"].Database.shutdown()
+    if get_auth_manager.is_created():
+        get_auth_manager().password_hasher.shutdown()
+
 class ChatInput(BaseModel):
     message: str
 
+class AnalyzeQueryInput(BaseModel):
+    query: str
+    analysis: Optional[Dict[str, Any]] = None
+    module: str = "natural_language_understanding"
+
 # Authentication related functions and classes
 class PasswordUpdateRequest(BaseModel):
     current_password: str
@@ -81,7 +197,13 @@ async def get_current_user(access_token: Optional[str] = Cookie(None)):
             print("Authentication failed: JWT payload missing 'sub' field")
             return None
         
-        user = auth_manager.get_user_by_id(int(user_id))
+        if JWT_EMBED_USER_CLAIMS and "name" in payload and "email" in payload:
+            if get_auth_manager().is_user_deleted(int(user_id)):
+                print(f"Authentication failed: User {user_id} has been deleted")
+                return None
+            user = {"id": int(user_id), "name": payload["name"], "email": payload["email"]}
+        else:
+            user = get_auth_manager().get_user_by_id(int(user_id))
         if not user:
             print(f"Authentication failed: No user found with ID {user_id}")
             return None
@@ -106,7 +228,7 @@ IMPORTANT INSTRUCTIONS:
 Example input: "What are the effects of climate change on polar bears?"
 Example output: climate change, polar bears, arctic, ice melt, habitat loss"""
 
-        response = cohere_client.generate(
+        response = get_cohere_client().generate(
             model='command',
             prompt=prompt,
             max_tokens=50,
@@ -174,10 +296,22 @@ Example output: climate change, polar bears, arctic, ice melt, habitat loss"""
         
         return [{"keyword": word, "from_original": True} for word in message_words[:5]]
 
-def search_articles(keywords_with_source):
+def find_articles_by_title(keyword):
+    # Served from the in-memory snapshot once it has loaded, otherwise from Supabase
+    snapshot = get_article_snapshot()
+    if snapshot.loaded.is_set():
+        return snapshot.search_titles(keyword)
+
+    response = get_supabase().table("articleInformationDB") \
+        .select("id, article_titles, news_information, source_link") \
+        .ilike("article_titles", f"%{keyword}%") \
+        .execute()
+    return response.data or []
+
+def search_articles(keywords_with_source, generate_neutral=True, generate_summaries=True):
     try:
         all_results = []
-        neutrality_checker = NeutralityCheck()
+        neutrality_checker = get_neutrality_checker()
         bias_scores_dict = {}  # Dictionary to store ID: bias_score pairs
         
         print("\nSearching for articles...")
@@ -198,18 +332,16 @@ def search_articles(keywords_with_source):
                 print(f"\nReached {max_articles_to_collect} articles. Stopping search.")
                 break
                 
-            response = supabase.table("articleInformationDB") \
-                .select("id, article_titles, news_information, source_link") \
-                .ilike("article_titles", f"%{keyword}%") \
-                .execute()
+            matches = find_articles_by_title(keyword)
             
-            if response.data:
-                for article in response.data:
+            if matches:
+                for article in matches:
                     # Skip if we already have this article
                     if any(r['id'] == article['id'] for r in all_results):
                         continue
                         
                     article_data = {
+                        "article_id": article['id'],
                         "customized_article": {
                             "title": article['article_titles'],
                             "content": article['news_information']
@@ -248,18 +380,16 @@ def search_articles(keywords_with_source):
                     print(f"\nReached {max_articles_to_collect} articles. Stopping search.")
                     break
                     
-                response = supabase.table("articleInformationDB") \
-                    .select("id, article_titles, news_information, source_link") \
-                    .ilike("article_titles", f"%{keyword}%") \
-                    .execute()
+                matches = find_articles_by_title(keyword)
                 
-                if response.data:
-                    for article in response.data:
+                if matches:
+                    for article in matches:
                         # Skip if we already have this article
                         if any(r['id'] == article['id'] for r in all_results):
                             continue
                             
                         article_data = {
+                            "article_id": article['id'],
                             "customized_article": {
                                 "title": article['article_titles'],
                                 "content": article['news_information']
@@ -336,6 +466,16 @@ def search_articles(keywords_with_source):
                 if article['biased_segments']:
                     print("Biased Segments:", ", ".join(article['biased_segments']))
         
+        # Under load the neutral article is skipped; summaries are then attached to the selected articles
+        if selected_articles and not generate_neutral:
+            if generate_summaries:
+                for article in selected_articles:
+                    article['summary'] = generate_article_summary(
+                        article.get('content', ''),
+                        article.get('title', 'No title')
+                    )
+            return all_results
+        
         # Generate neutral article from selected articles
         if selected_articles and len(selected_articles) >= 1:
             # Prepare source articles info
@@ -380,7 +520,7 @@ def search_articles(keywords_with_source):
             print(f"{'='*80}")
                 
             # Generate neutral article
-            neutral_article = neutral_generator.generate_neutral_article(selected_articles)
+            neutral_article = get_neutral_generator().generate_neutral_article(selected_articles)
             
             # Add source information and bias score
             neutral_article['source_articles'] = source_articles
@@ -410,126 +550,38 @@ def search_articles(keywords_with_source):
         return []
 
 @app.post("/api/chat")
-def receive_chat(chat_input: ChatInput, user = Depends(get_current_user)):
+async def receive_chat(chat_input: ChatInput, background_tasks: BackgroundTasks, user = Depends(get_current_user)):
     try:
         print(f"\n{'#'*50}")
         print(f"PROCESSING QUERY: '{chat_input.message}'")
         print(f"{'#'*50}")
         
-        # Save query to user history if user is authenticated
+        # Save query to user history after the response is sent, if user is authenticated
         if user:
-            print(f"User authenticated: ID {user['id']}, saving query to search history")
-            save_result = auth_manager.save_user_query(user["id"], chat_input.message)
-            if save_result["success"]:
-                print(f"Successfully saved query to search history. Query ID: {save_result.get('query_id')}")
-            else:
-                print(f"Failed to save query to search history: {save_result.get('message', 'Unknown error')}")
-        else:
-            print("User not authenticated, skipping query save to search history")
-        
-        # Extract keywords from the query
-        keywords_with_source = extract_keywords(chat_input.message)
-        
-        # Calculate keyword relevance to original query
-        query_words = set(word.lower().strip('.,?!:;()[]{}""\'') for word in chat_input.message.split() if len(word) > 3)
-        keyword_overlap = [k for k in keywords_with_source if any(query_word in k["keyword"].lower() or k["keyword"].lower() in query_word for query_word in query_words)]
-        
-        # Log keyword relevance
-        print(f"\nKeyword relevance analysis:")
-        print(f"Main words in query: {', '.join(query_words)}")
-        print(f"Keywords matching query: {', '.join(k['keyword'] for k in keyword_overlap)}")
-        print(f"Match percentage: {len(keyword_overlap)/len(keywords_with_source)*100:.1f}% of keywords match query terms")
-        
-        # Search for articles using the keywords
-        search_results = search_articles(keywords_with_source)
-        
-        # Find generated neutral article if it exists
-        neutral_article = next((article for article in search_results 
-                               if article.get('id') == 'neutral-generated'), None)
-        
-        # Other articles (excluding the neutral article)
-        regular_articles = [article for article in search_results 
-                           if article.get('id') != 'neutral-generated']
+            background_tasks.add_task(get_auth_manager().save_user_query, user["id"], chat_input.message)
         
-        # Sort articles to prioritize those matching original keywords
-        regular_articles.sort(key=lambda x: 0 if x.get('keyword_source') == 'original' else 1)
+        query_key = normalize_query(chat_input.message)
         
-        # Prepare response
-        response = {
-            "status": "success",
-            "query": chat_input.message,
-            "keywords": [k["keyword"] for k in keywords_with_source],
-            "keywords_with_source": keywords_with_source,
-            "keyword_analysis": {
-                "query_main_words": list(query_words),
-                "matching_keywords": [k["keyword"] for k in keyword_overlap],
-                "matching_keywords_with_source": keyword_overlap,
-                "match_percentage": round(len(keyword_overlap)/max(1, len(keywords_with_source))*100, 1)
-            },
-            "results": regular_articles,
-            "neutral_article": neutral_article
-        }
-        
-        if search_results:
-            neutral_msg = " and generated a neutral article" if neutral_article else ""
-            response["message"] = f"Found {len(regular_articles)} articles{neutral_msg}"
-            
-            # Include source information if we have a neutral article
-            if neutral_article and 'source_articles' in neutral_article:
-                # Map source articles to include the summaries
-                source_articles_with_summaries = []
-                
-                for source in neutral_article.get('source_articles', []):
-                    source_articles_with_summaries.append({
-                        "id": source.get('id', 'unknown'),
-                        "title": source.get('title', 'No title'),
-                        "bias_score": source.get('bias_score', 0),
-                        "source_link": source.get('source_link', ''),
-                        "summary": source.get('summary', [
-                            "• Summary not available",
-                            "• Please see full article",
-                            "• For more details"
-                        ])
-                    })
-                
-                response["sources"] = {
-                    "count": neutral_article.get("source_count", len(neutral_article['source_articles'])),
-                    "bias_range": neutral_article.get("source_bias_range", "Unknown"),
-                    "articles": source_articles_with_summaries
-                }
-                
-                # Print a summary of the sources with their summaries
-                print("\nSORTED SOURCE ARTICLES WITH SUMMARIES:")
-                # Sort by bias score for better presentation
-                sorted_sources = sorted(source_articles_with_summaries, key=lambda x: x.get('bias_score', 0))
-                for idx, source in enumerate(sorted_sources, 1):
-                    print(f"\nSOURCE {idx}: '{source.get('title')}'")
-                    print(f"  Bias Score: {source.get('bias_score', 0)}")
-                    print(f"  Link: {source.get('source_link', 'No link available')}")
-                    for bullet in source.get('summary', []):
-                        print(f"  {bullet}")
-        else:
-            response["message"] = "No articles found"
-        
-        # Print summary of the API response
-        print(f"\n{'*'*50}")
-        print(f"API RESPONSE SUMMARY:")
-        print(f"{'*'*50}")
-        print(f"Status: {response['status']}")
-        print(f"Message: {response['message']}")
-        print(f"Query: '{chat_input.message}'")
-        print(f"Keywords:")
-        for k in keywords_with_source:
-            source = "ORIGINAL" if k["from_original"] else "GENERATED"
-            print(f"  {k['keyword']} [{source}]")
-        print(f"Keyword match: {response['keyword_analysis']['match_percentage']}% overlap with query")
-        print(f"Articles from original keywords: {sum(1 for a in regular_articles if a.get('keyword_source') == 'original')}")
-        print(f"Articles from generated keywords: {sum(1 for a in regular_articles if a.get('keyword_source') == 'generated')}")
-        print(f"Regular article count: {len(regular_articles)}")
-        print(f"Neutral article: {'Generated' if neutral_article else 'None'}")
-        print(f"{'*'*50}\n")
+        # Under load, a recent full answer beats a degraded fresh one
+        tier = chat_admission.current_tier()
+        shared_response = chat_response_cache.get(query_key) if tier > TIER_FULL else None
+        if shared_response is None:
+            if tier >= TIER_CACHED_ONLY:
+                raise AdmissionRejected("Server is busy, please try again shortly")
             
+            # Identical queries arriving together share one pipeline run; the
+            # callers waiting on it are suspended on the event loop, not in threads
+            shared_response = await chat_flight.do(
+                query_key,
+                lambda: run_admitted_chat_pipeline(query_key, chat_input.message)
+            )
+        
+        # Each caller gets its own copy echoing its own message
+        response = dict(shared_response)
+        response["query"] = chat_input.message
         return response
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         return {
@@ -548,6 +600,162 @@ def receive_chat(chat_input: ChatInput, user = Depends(get_current_user)):
             "neutral_article": None
         }
 
+@app.post("/api/chat/stream")
+async def stream_chat(chat_input: ChatInput, user = Depends(get_current_user)):
+    """Answer through the NLU module, streamed as newline-delimited JSON events
+
+    The analysis and matching articles are sent first, then the response text
+    as it is generated, then a final "done" event with the full response.
+    """
+    # Hold a pipeline slot until the stream ends, so streams count against the same limit as /api/chat
+    slot = AsyncExitStack()
+    try:
+        await slot.enter_async_context(chat_admission.admit())
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    # Anonymous requests get no conversation history rather than one shared by every visitor
+    session_id = f"user:{user['id']}" if user else None
+
+    def events():
+        for event in get_nlu().process_query_stream(chat_input.message, session_id=session_id):
+            yield orjson.dumps(event) + b"\n"
+
+    # The slot is released once the response is finished, fails or the client disconnects
+    return ReleasingStreamingResponse(events(), release=slot.aclose, media_type="application/x-ndjson")
+
+async def run_admitted_chat_pipeline(query_key, message):
+    """Run the chat pipeline once a slot is free, at the tier the load allows
+    
+    Waiting for the slot happens on the event loop; only the admitted pipeline
+    is handed to the threadpool.
+    """
+    async with chat_admission.admit() as tier:
+        if tier >= TIER_CACHED_ONLY:
+            cached = chat_response_cache.get(query_key)
+            if cached is None:
+                raise AdmissionRejected("Server is busy, please try again shortly")
+            return cached
+        
+        response = await run_in_threadpool(run_chat_pipeline, message, tier)
+        if tier == TIER_FULL and response["status"] == "success":
+            chat_response_cache.set(query_key, response)
+        return response
+
+def run_chat_pipeline(message, tier=TIER_FULL):
+    """Run keyword extraction, article search and neutral generation for a chat message
+    
+    Higher degradation tiers skip the neutral article and then the article summaries.
+    """
+    # Extract keywords from the query
+    keywords_with_source = extract_keywords(message)
+    
+    # Calculate keyword relevance to original query
+    query_words = set(word.lower().strip('.,?!:;()[]{}""\'') for word in message.split() if len(word) > 3)
+    keyword_overlap = [k for k in keywords_with_source if any(query_word in k["keyword"].lower() or k["keyword"].lower() in query_word for query_word in query_words)]
+    
+    # Log keyword relevance
+    print(f"\nKeyword relevance analysis:")
+    print(f"Main words in query: {', '.join(query_words)}")
+    print(f"Keywords matching query: {', '.join(k['keyword'] for k in keyword_overlap)}")
+    print(f"Match percentage: {len(keyword_overlap)/len(keywords_with_source)*100:.1f}% of keywords match query terms")
+    
+    # Search for articles using the keywords
+    search_results = search_articles(
+        keywords_with_source,
+        generate_neutral=tier < TIER_NO_NEUTRAL_ARTICLE,
+        generate_summaries=tier < TIER_NO_SUMMARIES
+    )
+    
+    # Find generated neutral article if it exists
+    neutral_article = next((article for article in search_results 
+                           if article.get('id') == 'neutral-generated'), None)
+    
+    # Other articles (excluding the neutral article)
+    regular_articles = [article for article in search_results 
+                       if article.get('id') != 'neutral-generated']
+    
+    # Sort articles to prioritize those matching original keywords
+    regular_articles.sort(key=lambda x: 0 if x.get('keyword_source') == 'original' else 1)
+    
+    # Prepare response
+    response = {
+        "status": "success",
+        "query": message,
+        "keywords": [k["keyword"] for k in keywords_with_source],
+        "keywords_with_source": keywords_with_source,
+        "keyword_analysis": {
+            "query_main_words": list(query_words),
+            "matching_keywords": [k["keyword"] for k in keyword_overlap],
+            "matching_keywords_with_source": keyword_overlap,
+            "match_percentage": round(len(keyword_overlap)/max(1, len(keywords_with_source))*100, 1)
+        },
+        "results": regular_articles,
+        "neutral_article": neutral_article,
+        "degradation_tier": tier
+    }
+    
+    if search_results:
+        neutral_msg = " and generated a neutral article" if neutral_article else ""
+        response["message"] = f"Found {len(regular_articles)} articles{neutral_msg}"
+        
+        # Include source information if we have a neutral article
+        if neutral_article and 'source_articles' in neutral_article:
+            # Map source articles to include the summaries
+            source_articles_with_summaries = []
+            
+            for source in neutral_article.get('source_articles', []):
+                source_articles_with_summaries.append({
+                    "id": source.get('id', 'unknown'),
+                    "title": source.get('title', 'No title'),
+                    "bias_score": source.get('bias_score', 0),
+                    "source_link": source.get('source_link', ''),
+                    "summary": source.get('summary', [
+                        "• Summary not available",
+                        "• Please see full article",
+                        "• For more details"
+                    ])
+                })
+            
+            response["sources"] = {
+                "count": neutral_article.get("source_count", len(neutral_article['source_articles'])),
+                "bias_range": neutral_article.get("source_bias_range", "Unknown"),
+                "articles": source_articles_with_summaries
+            }
+            
+            # Print a summary of the sources with their summaries
+            print("\nSORTED SOURCE ARTICLES WITH SUMMARIES:")
+            # Sort by bias score for better presentation
+            sorted_sources = sorted(source_articles_with_summaries, key=lambda x: x.get('bias_score', 0))
+            for idx, source in enumerate(sorted_sources, 1):
+                print(f"\nSOURCE {idx}: '{source.get('title')}'")
+                print(f"  Bias Score: {source.get('bias_score', 0)}")
+                print(f"  Link: {source.get('source_link', 'No link available')}")
+                for bullet in source.get('summary', []):
+                    print(f"  {bullet}")
+    else:
+        response["message"] = "No articles found"
+    
+    # Print summary of the API response
+    print(f"\n{'*'*50}")
+    print(f"API RESPONSE SUMMARY:")
+    print(f"{'*'*50}")
+    print(f"Status: {response['status']}")
+    print(f"Message: {response['message']}")
+    print(f"Query: '{message}'")
+    print(f"Keywords:")
+    for k in keywords_with_source:
+        source = "ORIGINAL" if k["from_original"] else "GENERATED"
+        print(f"  {k['keyword']} [{source}]")
+    print(f"Keyword match: {response['keyword_analysis']['match_percentage']}% overlap with query")
+    print(f"Articles from original keywords: {sum(1 for a in regular_articles if a.get('keyword_source') == 'original')}")
+    print(f"Articles from generated keywords: {sum(1 for a in regular_articles if a.get('keyword_source') == 'generated')}")
+    print(f"Regular article count: {len(regular_articles)}")
+    print(f"Neutral article: {'Generated' if neutral_article else 'None'}")
+    print(f"{'*'*50}\n")
+        
+    return response
+
 @app.get("/api/welcome-text")
 def get_welcome_text():
     return {
@@ -559,6 +767,91 @@ def get_welcome_text():
 def root():
     return {"status": "API is running"}
 
+@app.get("/health/live")
+def liveness():
+    # The process is up and serving requests
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    # Ready once the SDK clients have been created
+    if clients_ready.is_set():
+        return {"status": "ready"}
+    response.status_code = 503
+    return {"status": "starting" if clients_warmup_error is None else "error", "error": clients_warmup_error}
+
+@app.get("/api/metrics")
+def get_metrics():
+    return {
+        "password_hasher": get_auth_manager().password_hasher.get_stats(),
+        "search_history_writes": get_auth_manager().get_query_save_stats(),
+        "chat_coalescing": chat_flight.get_stats(),
+        "chat_admission": chat_admission.get_stats(),
+        "chat_response_cache": chat_response_cache.get_stats(),
+        "llm_cache": get_llm_cache().get_stats(),
+        "article_snapshot": get_article_snapshot().memory_usage(),
+        "conversations": get_nlu().conversations.get_stats() if get_nlu.is_created() else None,
+        "topic_classifier": get_nlu().topic_classifier.get_stats() if get_nlu.is_created() else None
+    }
+
+def article_page(query, limit, offset, cursor, fields):
+    """Serve a page of articles from the snapshot, 503 until its first load finishes"""
+    snapshot = get_article_snapshot()
+    if not snapshot.loaded.is_set():
+        raise HTTPException(status_code=503, detail="Article index is loading", headers={"Retry-After": "1"})
+    try:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        return snapshot.search(query, limit=limit, offset=offset, cursor=cursor, fields=field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/search")
+def search_news(query: str, limit: int = 20, offset: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None):
+    # Articles containing every word of the query, newest first
+    return article_page(query, limit, offset, cursor, fields)
+
+@app.get("/search/match")
+def match_news(keyword: List[str] = Query(...), limit: int = 20):
+    # Articles matching any of several keywords in one pass, as ids, titles and snippets
+    snapshot = get_article_snapshot()
+    if not snapshot.loaded.is_set():
+        raise HTTPException(status_code=503, detail="Article index is loading", headers={"Retry-After": "1"})
+    return {"articles": snapshot.match_keywords(keyword, limit=limit)}
+
+@app.get("/news")
+def list_news(limit: int = 20, offset: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None):
+    # All articles, newest first
+    return article_page(None, limit, offset, cursor, fields)
+
+@app.get("/news/{article_id}")
+def get_news_article(article_id: int):
+    snapshot = get_article_snapshot()
+    if not snapshot.loaded.is_set():
+        raise HTTPException(status_code=503, detail="Article index is loading", headers={"Retry-After": "1"})
+    article = snapshot.get(article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return article
+
+@app.post("/analyze-query")
+def save_query_analysis(analysis_input: AnalyzeQueryInput):
+    # Queued in the analysis write buffer, so this returns without waiting on the insert.
+    # Anyone can post here, so the row is never taken for an LLM label.
+    saved = get_database().save_analysis_result(
+        analysis_input.query,
+        dict(analysis_input.analysis or {}, label_source="client"),
+        analysis_input.module
+    )
+    return {"success": saved}
+
+@app.get("/analyze-query")
+def get_query_analysis(module: str, query_hash: str):
+    # Latest analysis saved for a query, looked up by the hash of the normalized query
+    analysis = get_database().fetch_analysis(module, content_hash=query_hash)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="No analysis found")
+    return analysis
+
 def generate_article_summary(article_content, article_title):
     """Generate a brief 3-point summary of an article using Cohere API"""
     try:
@@ -578,7 +871,7 @@ def generate_article_summary(article_content, article_title):
         • Third key point
         """
         
-        response = cohere_client.generate(
+        response = get_cohere_client().generate(
             model='command',
             prompt=prompt,
             max_tokens=150,
@@ -611,16 +904,31 @@ def generate_article_summary(article_content, article_title):
 
 # Authentication and User Management Routes
 
+async def run_password_operation(operation):
+    """Await an auth call that hashes passwords, turning a full hasher queue into a 503
+    
+    The hashing runs on the hasher's own pool and is awaited as a future, so a
+    pending hash holds no request thread.
+    """
+    try:
+        return await operation
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many authentication requests, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
 @app.post("/api/auth/register")
 async def register(user_data: UserCreate, response: Response):
-    result = auth_manager.register_user(user_data)
+    result = await run_password_operation(get_auth_manager().register_user(user_data))
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     
     # Create JWT token
     user_id = result["user"]["id"]
-    access_token = create_access_token(user_id)
+    access_token = create_access_token(user_id, result["user"])
     print(f"User registered successfully: {result['user']['name']} (ID: {user_id})")
     print(f"Setting access_token cookie for user {user_id}")
     
@@ -638,14 +946,14 @@ async def register(user_data: UserCreate, response: Response):
 
 @app.post("/api/auth/login")
 async def login(credentials: UserLogin, response: Response):
-    result = auth_manager.login_user(credentials)
+    result = await run_password_operation(get_auth_manager().login_user(credentials))
     
     if not result["success"]:
         raise HTTPException(status_code=401, detail=result["message"])
     
     # Create JWT token
     user_id = result["user"]["id"]
-    access_token = create_access_token(user_id)
+    access_token = create_access_token(user_id, result["user"])
     print(f"User logged in successfully: {result['user']['name']} (ID: {user_id})")
     print(f"Setting access_token cookie for user {user_id}")
     
@@ -681,11 +989,11 @@ async def change_password(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    result = auth_manager.update_password(
+    result = await run_password_operation(get_auth_manager().update_password(
         user["id"],
         password_data.current_password,
         password_data.new_password
-    )
+    ))
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -697,7 +1005,7 @@ async def delete_account(response: Response, user = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    result = auth_manager.delete_user(user["id"])
+    result = get_auth_manager().delete_user(user["id"])
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -708,19 +1016,27 @@ async def delete_account(response: Response, user = Depends(get_current_user)):
     return {"message": "Account deleted successfully"}
 
 @app.get("/api/user/queries")
-async def get_user_queries(user = Depends(get_current_user)):
+async def get_user_queries(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    user = Depends(get_current_user)
+):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    result = auth_manager.get_user_queries(user["id"])
+    result = get_auth_manager().get_user_queries(user["id"], limit=limit, cursor=cursor, include_total=include_total)
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     
-    return {"queries": result["queries"]}
+    response = {"queries": result["queries"], "next_cursor": result["next_cursor"]}
+    if include_total:
+        response["total"] = result["total"]
+    return response
 
 # Helper function to create a JWT token
-def create_access_token(user_id: int):
+def create_access_token(user_id: int, user: Optional[Dict[str, Any]] = None):
     expires = datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_MINUTES)
     
     payload = {
@@ -728,6 +1044,11 @@ def create_access_token(user_id: int):
         "exp": expires
     }
     
+    # Only non-sensitive claims are embedded; everything else still comes from the users table
+    if JWT_EMBED_USER_CLAIMS and user:
+        payload["name"] = user.get("name")
+        payload["email"] = user.get("email")
+    
     access_token = pyjwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
     print(f"Created JWT token for user {user_id}, expires: {expires}")
     return access_token
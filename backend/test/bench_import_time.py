@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def time_import(runs):
+    """Time a fresh interpreter importing main.py, the same work a new uvicorn worker does"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def slowest_imports(count):
+    """Return the modules with the largest cumulative import time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return rows[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark how long importing backend/main.py takes")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    # Baseline: starting an interpreter that imports nothing
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    baseline = time.perf_counter() - start
+
+    timings = time_import(args.runs)
+    print(f"Interpreter startup:  {baseline * 1000:.0f} ms")
+    print(f"import main (best):   {min(timings) * 1000:.0f} ms")
+    print(f"import main (mean):   {sum(timings) / len(timings) * 1000:.0f} ms over {args.runs} runs")
+
+    print(f"\nSlowest imports (cumulative):")
+    for cumulative_us, name in slowest_imports(args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
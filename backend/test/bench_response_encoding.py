@@ -0,0 +1,108 @@
+import json
+import gzip
+import time
+import random
+import argparse
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = ("the government announced new climate policy on energy markets while critics argued that "
+         "economic growth and public health outcomes depend on regional investment and trade").split()
+
+def make_text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def make_chat_payload(articles, body_words, seed=0):
+    """Build a response shaped like /api/chat: article bodies, a neutral article and summarized sources"""
+    rng = random.Random(seed)
+    results = []
+    for i in range(articles):
+        results.append({
+            "id": i + 1,
+            "title": make_text(rng, 10),
+            "content": make_text(rng, body_words),
+            "source_link": f"https://example.com/news/{i + 1}",
+            "bias_score": rng.randint(0, 100),
+            "biased_segments": [make_text(rng, 6) for _ in range(3)],
+            "matched_keyword": "climate",
+            "keyword_source": "original"
+        })
+    sources = [{
+        "id": article["id"],
+        "title": article["title"],
+        "bias_score": article["bias_score"],
+        "source_link": article["source_link"],
+        "summary": [f"• {make_text(rng, 15)}" for _ in range(3)]
+    } for article in results[:4]]
+    results.append({
+        "id": "neutral-generated",
+        "title": make_text(rng, 10),
+        "content": make_text(rng, body_words * 2),
+        "source_articles": sources,
+        "source_count": len(sources),
+        "bias_score": 50
+    })
+    return {
+        "query": "climate policy",
+        "topic": "Climate",
+        "keywords": ["climate", "policy", "energy"],
+        "results": results,
+        "sources": sources,
+        "degradation_tier": 0
+    }
+
+def stdlib_dumps(payload):
+    # Same options as FastAPI's default JSONResponse
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def orjson_dumps(payload):
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+def best_time(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding and compression of chat responses")
+    parser.add_argument("--articles", type=int, default=6, help="Articles in each response")
+    parser.add_argument("--words", type=int, default=800, help="Words in each article body")
+    parser.add_argument("--runs", type=int, default=50, help="Repetitions per measurement")
+    args = parser.parse_args()
+
+    payload = make_chat_payload(args.articles, args.words)
+    body = orjson_dumps(payload)
+
+    print(f"Payload: {args.articles} articles x {args.words} words\n")
+    print("Serialization (best of runs):")
+    print(f"  json (FastAPI default): {best_time(lambda: stdlib_dumps(payload), args.runs) * 1000:7.2f} ms")
+    print(f"  orjson:                 {best_time(lambda: orjson_dumps(payload), args.runs) * 1000:7.2f} ms")
+
+    print("\nBytes on the wire:")
+    print(f"  identity:     {len(body):8d} bytes")
+    encoders = [
+        ("gzip level 6", lambda: gzip.compress(body, compresslevel=6)),
+        ("gzip level 9", lambda: gzip.compress(body, compresslevel=9))
+    ]
+    if brotli is not None:
+        encoders += [
+            ("br quality 4", lambda: brotli.compress(body, quality=4)),
+            ("br quality 11", lambda: brotli.compress(body, quality=11))
+        ]
+    else:
+        print("  (brotli not installed, skipping br)")
+
+    for name, encode in encoders:
+        size = len(encode())
+        elapsed = best_time(encode, args.runs)
+        print(f"  {name:13s} {size:8d} bytes ({size / len(body):5.1%})  encode {elapsed * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
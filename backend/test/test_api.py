@@ -30,7 +30,7 @@ async def test_endpoints():
             response = await client.get(f"{base_url}/news")
             print(f"Status code: {response.status_code}")
             if response.status_code == 200:
-                data = response.json()
+                data = response.json()["articles"]
                 article_count = len(data)
                 print(f"Retrieved {article_count} articles from Supabase")
                 if article_count > 0:
@@ -46,8 +46,8 @@ async def test_endpoints():
         try:
             # First get all news to find a valid ID
             response = await client.get(f"{base_url}/news")
-            if response.status_code == 200 and len(response.json()) > 0:
-                article_id = response.json()[0]["id"]
+            if response.status_code == 200 and len(response.json()["articles"]) > 0:
+                article_id = response.json()["articles"][0]["id"]
                 print(f"Testing with article ID: {article_id}")
                 
                 response = await client.get(f"{base_url}/news/{article_id}")
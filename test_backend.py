@@ -31,7 +31,7 @@ def test_backend():
         response = requests.get(f"{backend_url}/news")
         print(f"Status: {response.status_code}")
         if response.status_code == 200:
-            articles = response.json()
+            articles = response.json()["articles"]
             print(f"Found {len(articles)} articles")
             if articles:
                 sample = articles[0]
@@ -50,7 +50,7 @@ def test_backend():
         response = requests.get(f"{backend_url}/search?query={query}")
         print(f"Status: {response.status_code}")
         if response.status_code == 200:
-            results = response.json()
+            results = response.json()["articles"]
             print(f"Found {len(results)} results for query '{query}'")
             if results:
                 sample = results[0]
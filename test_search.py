@@ -29,7 +29,7 @@ def test_search(query):
             print(f"Error: Search endpoint returned status code {response.status_code}")
             return False
             
-        articles = response.json()
+        articles = response.json()["articles"]
         print(f"Found {len(articles)} articles matching '{query}'")
         
         if articles:
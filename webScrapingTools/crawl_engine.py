@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from urllib.parse import urlparse
+import aiohttp
+from bs4 import BeautifulSoup
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+DNS_CACHE_SECONDS = 600
+KEEPALIVE_SECONDS = 30
+
+# Statuses that mean a URL won't become an article by retrying it
+PERMANENT_FAILURES = {401, 403, 404, 405, 410, 451}
+
+
+class CrawlEngine:
+    """Fetches pages concurrently over one shared aiohttp session
+
+    At most `max_concurrency` requests run at once across the crawl and at
+    most `per_host` against any single site, so sources are crawled in
+    parallel without hammering one of them. The slots are taken before a
+    request starts, so time spent waiting for a slot doesn't count against
+    the request timeout. Cancelling the task running the crawl cancels every
+    request in flight and the session is closed on exit.
+
+    With a `cache_path`, the ETag and Last-Modified of every article stored
+    are kept between crawls so the next one can make conditional requests,
+    along with URLs that failed permanently so they aren't requested again
+    for `negative_ttl` seconds. A page's validators only count once the caller
+    has stored it and calls `commit_validators`, so an article whose insert
+    failed, or whose crawl was cancelled, is downloaded in full next time.
+    """
+
+    def __init__(self, max_concurrency=20, per_host=2, timeout=15, headers=None, cache_path=None, negative_ttl=86400):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.cache_path = cache_path
+        self.negative_ttl = negative_ttl
+        self.session = None
+        self._global_slots = None
+        self._host_slots = {}
+        self._validators = {}  # url -> {"etag": ..., "last_modified": ...}
+        self._uncommitted = {}  # Validators of pages fetched but not stored yet
+        self._failures = {}  # url -> (status, time it failed)
+        self.stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "failed": 0,
+            "skipped_failed": 0
+        }
+
+    async def __aenter__(self):
+        self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        self._load_cache()
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_host,
+                ttl_dns_cache=DNS_CACHE_SECONDS,  # Resolve each site once per crawl rather than per request
+                keepalive_timeout=KEEPALIVE_SECONDS  # Keep connections open between pages of the same site
+            )
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        # Only committed validators are saved, so this is safe after a cancelled or failed crawl
+        self._save_cache()
+
+    def commit_validators(self, url):
+        """Keep the validators of `url` for the next crawl, once its article has been stored"""
+        validators = self._uncommitted.pop(url, None)
+        if validators:
+            self._validators[url] = validators
+
+    def has_failed(self, url):
+        """Whether `url` failed recently enough that it shouldn't be requested again"""
+        failure = self._failures.get(url)
+        if failure is None:
+            return False
+        if time.time() - failure[1] > self.negative_ttl:
+            del self._failures[url]
+            return False
+        return True
+
+    async def fetch(self, url, conditional=False):
+        """Return the body of `url`, or None if the request fails or isn't a 200
+
+        With `conditional`, the validators saved from the last crawl are sent
+        along, and a page that hasn't changed since then comes back as None
+        without its body being transferred again.
+        """
+        if self.has_failed(url):
+            self.stats["skipped_failed"] += 1
+            return None
+
+        headers = {}
+        validators = self._validators.get(url) if conditional else None
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        async with self._slots(url):
+            self.stats["requests"] += 1
+            try:
+                async with self.session.get(url, allow_redirects=True, headers=headers) as response:
+                    if response.status == 304:
+                        self.stats["not_modified"] += 1
+                        print(f"Unchanged since the last crawl: {url}")
+                        return None
+                    if response.status != 200:
+                        print(f"Failed to access {url}: HTTP status code {response.status}")
+                        self._record_failure(url, response.status)
+                        return None
+                    html = await response.text(errors='replace')
+                    if conditional:
+                        self._record_validators(url, response.headers)
+                    return html
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Failed to fetch {url}: {e}")
+                self.stats["failed"] += 1
+                return None
+
+    async def parse(self, html):
+        """Parse HTML in a worker thread so the event loop keeps serving other requests"""
+        return await self.run_blocking(BeautifulSoup, html, 'html.parser')
+
+    async def run_blocking(self, func, *args):
+        """Run CPU-bound or blocking work (parsing, database inserts) off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(func, *args))
+
+    @asynccontextmanager
+    async def _slots(self, url):
+        host_slots = self._host_slots.setdefault(urlparse(url).netloc, asyncio.Semaphore(self.per_host))
+        # The host's slot comes first, so requests queued for a busy site don't hold global slots other sites could use
+        async with host_slots, self._global_slots:
+            yield
+
+    def _record_validators(self, url, headers):
+        validators = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+        if validators["etag"] or validators["last_modified"]:
+            self._uncommitted[url] = validators
+
+    def _record_failure(self, url, status):
+        self.stats["failed"] += 1
+        if status in PERMANENT_FAILURES:
+            self._failures[url] = (status, time.time())
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            self._validators = cached.get("validators", {})
+            self._failures = {url: tuple(failure) for url, failure in cached.get("failures", {}).items()}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable crawl cache {self.cache_path}: {e}")
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        # Drop expired failures so the file doesn't grow without bound
+        now = time.time()
+        failures = {url: failure for url, failure in self._failures.items() if now - failure[1] <= self.negative_ttl}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"validators": self._validators, "failures": failures}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Failed to save crawl cache {self.cache_path}: {e}")
@@ -0,0 +1,116 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("bs4")
+
+sys.path.append(os.path.dirname(__file__))
+
+from crawl_engine import CrawlEngine
+
+
+def test_slots_limit_global_and_per_host_concurrency():
+    async def scenario():
+        async with CrawlEngine(max_concurrency=20, per_host=2) as engine:
+            running = {"total": 0, "peak": 0}
+            per_host = {}
+            host_peaks = {}
+
+            async def fetch(url):
+                host = url.split("/")[2]
+                async with engine._slots(url):
+                    running["total"] += 1
+                    per_host[host] = per_host.get(host, 0) + 1
+                    running["peak"] = max(running["peak"], running["total"])
+                    host_peaks[host] = max(host_peaks.get(host, 0), per_host[host])
+                    await asyncio.sleep(0.01)
+                    per_host[host] -= 1
+                    running["total"] -= 1
+
+            # Queue every page of one site first, as a source's article links are
+            urls = [f"https://site{host}.example/{page}" for host in range(10) for page in range(15)]
+            await asyncio.gather(*(fetch(url) for url in urls))
+            return running["peak"], host_peaks
+
+    peak, host_peaks = asyncio.run(scenario())
+    # Requests queued for one busy site don't keep the others from using the global slots
+    assert peak == 20
+    assert max(host_peaks.values()) == 2
+
+
+class FakeResponse:
+    def __init__(self, status, body="", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def text(self, errors="strict"):
+        return self.body
+
+
+class FakeSession:
+    """Serves canned responses and records the headers of each request."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, allow_redirects=True, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses[url]
+
+    async def close(self):
+        pass
+
+
+async def crawl(cache_path, responses, urls, stored):
+    """Fetch `urls` conditionally and commit the validators of those in `stored`."""
+    async with CrawlEngine(cache_path=cache_path) as engine:
+        await engine.session.close()
+        engine.session = FakeSession(responses)
+        for url in urls:
+            html = await engine.fetch(url, conditional=True)
+            if html is not None and url in stored:
+                engine.commit_validators(url)
+        return engine
+
+
+def test_only_committed_validators_are_saved_and_sent_next_time(tmp_path):
+    cache_path = str(tmp_path / "crawl_cache.json")
+    stored_url = "https://news.example/stored"
+    failed_url = "https://news.example/insert-failed"
+    responses = {
+        stored_url: FakeResponse(200, "<html>stored</html>", {"ETag": '"v1"'}),
+        failed_url: FakeResponse(200, "<html>failed</html>", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    }
+    asyncio.run(crawl(cache_path, responses, [stored_url, failed_url], stored={stored_url}))
+
+    responses[stored_url] = FakeResponse(304)
+    engine = asyncio.run(crawl(cache_path, responses, [stored_url, failed_url], stored=set()))
+
+    sent = dict(engine.session.requests)
+    assert sent[stored_url] == {"If-None-Match": '"v1"'}
+    # The article whose insert failed is downloaded in full again
+    assert sent[failed_url] == {}
+    assert engine.stats["not_modified"] == 1
+
+
+def test_permanent_failures_are_not_requested_again(tmp_path):
+    cache_path = str(tmp_path / "crawl_cache.json")
+    gone_url = "https://news.example/gone"
+    responses = {gone_url: FakeResponse(404)}
+    asyncio.run(crawl(cache_path, responses, [gone_url], stored=set()))
+
+    engine = asyncio.run(crawl(cache_path, responses, [gone_url], stored=set()))
+
+    assert engine.session.requests == []
+    assert engine.stats["skipped_failed"] == 1
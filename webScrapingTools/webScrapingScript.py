@@ -1,17 +1,15 @@
 from bs4 import BeautifulSoup
 from supabase import create_client, Client
-import requests
 import time
 import re
 import csv
 import json
 import sys
 import asyncio
-import aiohttp
 from urllib.parse import urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import os
+from crawl_engine import CrawlEngine
 
 # Your Supabase credentials 
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -128,11 +126,12 @@ def insert_news_sources(supabase, source_name, source_link, news_information, ar
         
         if response.data:
             print(f"Successfully inserted article from {source_name}")
-        else:
-            print(f"Failed to insert article from {source_name}")
+            return True
+        print(f"Failed to insert article from {source_name}")
     
     except Exception as e:
         print(f"Failed to insert article from {source_name}: {e}")
+    return False
 
 print(f"Processing {len(news_sources)} news sources\n")
 
@@ -203,20 +202,6 @@ def is_valid_url(url, base_domain):
     except:
         return False
 
-async def verify_urls(urls, headers):
-    """Asynchronously verify multiple URLs"""
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async def check_url(url):
-            try:
-                async with session.head(url, timeout=5, allow_redirects=True) as response:
-                    return url if response.status == 200 else None
-            except:
-                return None
-
-        tasks = [check_url(url) for url in urls]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        return [url for url in results if url]
-
 def normalize_url(href, base_url):
     """Normalize URL with proper error handling"""
     try:
@@ -254,13 +239,8 @@ def process_links(tags, base_url, base_domain):
             continue
     return links
 
-def extract_article_links(soup, base_url, depth=0, visited_urls=None, max_links=15):
-    if visited_urls is None:
-        visited_urls = set()
-    if depth > 2:
-        return []
-        
-    links = set()
+def score_article_links(soup, base_url, visited_urls):
+    """Return candidate article links on a page, best scoring first"""
     base_domain = urlparse(base_url).netloc
     
     # Define priority areas with scoring
@@ -294,18 +274,27 @@ def extract_article_links(soup, base_url, depth=0, visited_urls=None, max_links=
     
     # Sort links by score
     sorted_links = sorted(scored_links.items(), key=lambda x: x[1], reverse=True)
-    candidate_links = [link for link, score in sorted_links]
+    return [link for link, score in sorted_links]
+
+async def extract_article_links(engine, soup, base_url, depth=0, visited_urls=None, max_links=15):
+    if visited_urls is None:
+        visited_urls = set()
+    if depth > 2:
+        return []
     
-    # Asynchronously verify URLs
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    valid_links = loop.run_until_complete(verify_urls(candidate_links[:max_links], headers))
-    loop.close()
+    # Scoring walks the whole page, so it runs off the event loop
+    candidate_links = await engine.run_blocking(score_article_links, soup, base_url, visited_urls)
     
-    return valid_links
+    # Links aren't verified separately: the one GET that downloads an article
+    # is the check, and links that failed before are left out
+    article_links = [link for link in candidate_links if not engine.has_failed(link)][:max_links]
+    visited_urls.update(article_links)
+    return article_links
+
+async def fetch_articles(engine, links):
+    """Download candidate article pages once, keeping the bodies of the ones that loaded"""
+    pages = await asyncio.gather(*(engine.fetch(link, conditional=True) for link in links))
+    return {link: html for link, html in zip(links, pages) if html is not None}
 
 def find_section_links(soup, base_url, base_domain, visited_urls):
     section_links = set()
@@ -376,165 +365,143 @@ def has_article_content(soup):
 # Minimum required articles before continuing
 MIN_ARTICLES = 10 
 
-# List to store article links
-all_article_links = []
-all_articles_data = [] # Create an empty list to hold article data
-
-# Iterate through each news source
-for source_name, base_url in news_sources.items():
-    try:
-        print(f"\nProcessing source: {source_name}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Get the main page
-        main_page = requests.get(base_url, timeout=15, headers=headers)
-        if main_page.status_code != 200:
-            print(f"Failed to access {source_name}: HTTP status code {main_page.status_code}")
-            continue
-        
-        # Parsing the main page
-        main_soup = BeautifulSoup(main_page.text, 'html.parser')
-        visited_urls = set([base_url])
-
+# Crawl limits: requests in flight across all sources, and against any one site
+MAX_CONCURRENCY = int(os.environ.get("CRAWL_MAX_CONCURRENCY", "20"))
+PER_HOST_CONCURRENCY = int(os.environ.get("CRAWL_PER_HOST_CONCURRENCY", "2"))
+# Stop the whole crawl after this many seconds (0 means no limit)
+CRAWL_DEADLINE = float(os.environ.get("CRAWL_DEADLINE_SECONDS", "0"))
+# Validators and failed URLs from earlier crawls, for conditional requests and the negative cache
+CRAWL_CACHE_PATH = os.path.expanduser(os.environ.get("CRAWL_CACHE_PATH", "~/.cache/biasbreaker/crawl_cache.json"))
+
+def extract_article(source_name, link, html):
+    """Parse an article page and return its data, or None if it isn't a usable English article"""
+    article_soup = BeautifulSoup(html, 'html.parser')
+    
+    # Check if the article is in English
+    if not is_english_article(article_soup):
+        print(f"Article is not in English, skipping: {link}")
+        return None
+    
+    # Check if this page has the characteristics of an article
+    if not has_article_content(article_soup):
+        print(f"Page does not appear to have enough content so therefore not an article, skipping: {link}")
+        return None
 
+    # Remove unwanted elements
+    for element in article_soup(["script", "style", "meta", "noscript", "header", "footer", "nav", "aside"]):
+        element.extract()
+    
+    # Try to find the article content
+    article_element = article_soup.find(['article', 'main', 'div'], class_=lambda c: c and any(x in str(c).lower() for x in ['article', 'story', 'content', 'post']))
+    
+    # Get the text content
+    if article_element:
+        text = article_element.get_text(separator=' ', strip=True)
+    else:
+        text = article_soup.get_text(separator=' ', strip=True)
+    
+    text = re.sub(r'\s+', ' ', text).strip()
+    
+    # If text is too short, it's likely not an article
+    if len(text) < 400:
+        print(f"Content too short ({len(text)} chars), likely not an article: {link}")
+        return None
 
-        article_links = extract_article_links(main_soup, base_url, visited_urls=visited_urls)
-        
-        # Keep trying until we have enough articles or have exhausted our options
-        attempts = 0
-        while len(article_links) < MIN_ARTICLES and attempts < 3:
-            print(f"Found only {len(article_links)} articles, searching deeper...")
-            new_links = []
-            for link in article_links:
-                try:
-                    page = requests.get(link, timeout=15, headers=headers)
-                    if page.status_code == 200:
-                        soup = BeautifulSoup(page.text, 'html.parser')
-                        new_links.extend(extract_article_links(soup, base_url, visited_urls=visited_urls))
-                except Exception as e:
-                    print(f"Error following link {link}: {e}")
-            article_links.extend(new_links)
-            article_links = list(set(article_links))  # Remove duplicates
-            attempts += 1
-            
-        print(f"Found {len(article_links)} potential articles to process")
-        
-        # Add links to the all_article_links list
-        all_article_links.extend(article_links)
-
-        # Process each article
-        for link in article_links:
-            try:
-                print(f"\nProcessing article: {link}")
-                article_page = requests.get(link, timeout=15, headers=headers)
-                
-                if article_page.status_code == 200:
-                    article_soup = BeautifulSoup(article_page.text, 'html.parser')
-                    
-                    # Check if the article is in English
-                    if not is_english_article(article_soup):
-                        print(f"Article is not in English, skipping")
-                        continue
-                    
-                    # Check if this page has the characteristics of an article
-                    if not has_article_content(article_soup):
-                        print(f"Page does not appear to have enough content so therefore not an article, skipping")
-                        continue
-
-                    # Remove unwanted elements
-                    for element in article_soup(["script", "style", "meta", "noscript", "header", "footer", "nav", "aside"]):
-                        element.extract()
-                    
-                    # Try to find the article content
-                    article_element = article_soup.find(['article', 'main', 'div'], class_=lambda c: c and any(x in str(c).lower() for x in ['article', 'story', 'content', 'post']))
-                    
-                    # Get the text content
-                    if article_element:
-                        text = article_element.get_text(separator=' ', strip=True)
-                    else:
-                        text = article_soup.get_text(separator=' ', strip=True)
-                    
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    
-                    # If text is too short, it's likely not an article
-                    if len(text) < 400:
-                        print(f"Content too short ({len(text)} chars), likely not an article")
-                        continue
-
-                    # Append the article data to the list
-                    article_data = {
-                        "source": source_name,
-                        "article_link": link,
-                        "article_text": text,
-                        "article_headline": article_soup.title.string
-                    }
-                    all_articles_data.append(article_data)
-                    
-                    # Print the article details
-                    print(f"Source: {source_name}")
-                    print(f"Article Headline: {article_soup.title.string}")
-                    print(f"Article link: {link}")
-                    print(f"Article length: {len(text)} characters")
-                    print(f"Article text preview: {text[:100]}...") # Print just a preview
-
-                    # Insert the article into Supabase
-                    insert_news_sources(supabase, source_name, link, text, article_soup.title.string)
-
-                else:
-                    print(f"Failed to access article {link}: HTTP status code {article_page.status_code}")
-
-                #time.sleep(2)  # Pause between article requests
-                
-                
-            except Exception as e:
-                print(f"Failed to scrape article {link}: {e}")
-        
-    except Exception as e:
-        print(f"Failed to process source {source_name}: {e}")
+    return {
+        "source": source_name,
+        "article_link": link,
+        "article_text": text,
+        "article_headline": article_soup.title.string if article_soup.title else None
+    }
 
-print(f"\nScraping complete! Processed {len(all_articles_data)} articles.")
+async def process_article(engine, source_name, link, html):
+    """Extract and store one downloaded article"""
+    article_data = await engine.run_blocking(extract_article, source_name, link, html)
+    if article_data is None:
+        return None
+    
+    # Print the article details
+    print(f"\nSource: {source_name}")
+    print(f"Article Headline: {article_data['article_headline']}")
+    print(f"Article link: {link}")
+    print(f"Article length: {len(article_data['article_text'])} characters")
+    print(f"Article text preview: {article_data['article_text'][:100]}...") # Print just a preview
+
+    # Insert the article into Supabase; only a stored article may come back as "unchanged" next crawl
+    if await engine.run_blocking(insert_news_sources, supabase, source_name, link, article_data['article_text'], article_data['article_headline']):
+        engine.commit_validators(link)
+    return article_data
+
+async def crawl_source(engine, source_name, base_url):
+    """Find article links on a source's homepage (searching deeper if needed) and process them concurrently"""
+    print(f"\nProcessing source: {source_name}")
+    
+    # Get the main page
+    main_html = await engine.fetch(base_url)
+    if main_html is None:
+        print(f"Failed to access {source_name}")
+        return []
+    
+    # Parsing the main page
+    main_soup = await engine.parse(main_html)
+    visited_urls = set([base_url])
 
-# Update the main processing loop to use ThreadPoolExecutor
-def process_all_sources(news_sources):
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {
-            executor.submit(process_news_source, source_name, url): source_name 
-            for source_name, url in news_sources.items()
-        }
+    article_links = await extract_article_links(engine, main_soup, base_url, visited_urls=visited_urls)
+    articles = await fetch_articles(engine, article_links)
+    
+    # Keep trying until we have enough articles or have exhausted our options
+    expanded = set()
+    attempts = 0
+    while len(articles) < MIN_ARTICLES and attempts < 3:
+        print(f"{source_name}: found only {len(articles)} articles, searching deeper...")
+        new_links = []
+        for link, html in list(articles.items()):
+            # Look for more links on pages already downloaded rather than fetching them again
+            if link in expanded:
+                continue
+            expanded.add(link)
+            soup = await engine.parse(html)
+            new_links.extend(await extract_article_links(engine, soup, base_url, visited_urls=visited_urls))
+        if not new_links:
+            break
+        articles.update(await fetch_articles(engine, list(dict.fromkeys(new_links))))
+        attempts += 1
         
-        all_article_links = []
-        for future in futures:
-            source_name = futures[future]
-            try:
-                article_links = future.result()
-                all_article_links.extend(article_links)
-                print(f"Found {len(article_links)} articles from {source_name}")
-            except Exception as e:
-                print(f"Failed to process {source_name}: {str(e)}")
+    print(f"{source_name}: found {len(articles)} potential articles to process")
+
+    results = await asyncio.gather(*(process_article(engine, source_name, link, html) for link, html in articles.items()))
+    return [article for article in results if article]
+
+async def crawl_all(news_sources):
+    """Crawl every source concurrently within the engine's global and per-host limits"""
+    async with CrawlEngine(max_concurrency=MAX_CONCURRENCY, per_host=PER_HOST_CONCURRENCY, timeout=15,
+                           cache_path=CRAWL_CACHE_PATH) as engine:
+        results = await asyncio.gather(
+            *(crawl_source(engine, source_name, base_url) for source_name, base_url in news_sources.items()),
+            return_exceptions=True
+        )
+    print(f"\nRequests: {engine.stats['requests']}, unchanged: {engine.stats['not_modified']}, "
+          f"failed: {engine.stats['failed']}, skipped after earlier failures: {engine.stats['skipped_failed']}")
     
-    return all_article_links
+    all_articles_data = []
+    for source_name, result in zip(news_sources, results):
+        if isinstance(result, Exception):
+            print(f"Failed to process source {source_name}: {result}")
+        else:
+            all_articles_data.extend(result)
+    return all_articles_data
 
-def process_news_source(source_name, base_url):
-    """Process a single news source with better error handling"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        }
-        
-        response = requests.get(base_url, timeout=15, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        visited_urls = set([base_url])
-        
-        article_links = extract_article_links(soup, base_url, visited_urls=visited_urls)
-        return article_links
-        
-    except Exception as e:
-        print(f"Error processing {source_name}: {str(e)}")
-        return []
+async def main():
+    # Cancelling the crawl (deadline or Ctrl-C) cancels every request in flight
+    if CRAWL_DEADLINE > 0:
+        try:
+            return await asyncio.wait_for(crawl_all(news_sources), timeout=CRAWL_DEADLINE)
+        except asyncio.TimeoutError:
+            print(f"\nCrawl stopped after the {CRAWL_DEADLINE:.0f} second deadline")
+            return []
+    return await crawl_all(news_sources)
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    all_articles_data = asyncio.run(main())
+    print(f"\nScraping complete! Processed {len(all_articles_data)} articles in {time.perf_counter() - start:.0f} seconds.")